@@ -1,10 +1,12 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.core.exceptions import ValidationError
 from django import forms
 from nested_admin.nested import NestedModelAdmin, NestedTabularInline
 from reversion_compare.admin import CompareVersionAdmin
 
-from .models import Duty, Assignment, Shabbat, Roster
+from .models import Duty, Assignment, Shabbat, Roster, TurnStats
+from .priorities import priority_candidates
 
 
 class AssignmentInline(NestedTabularInline):
@@ -39,12 +41,29 @@ class ShabbatInline(NestedTabularInline):
 
 
 
+class ShabbatChangeList(ChangeList):
+    def get_results(self, request):
+        super(ShabbatChangeList, self).get_results(request)
+        candidates = priority_candidates(self.result_list)          # For the whole page at once
+        for shabbat in self.result_list:
+            shabbat.priority_candidates = candidates[shabbat.pk]
+
+
 @admin.register(Shabbat)
 class ShabbatAdmin(NestedModelAdmin):
     inlines = [RosterInline, ]
     #exclude = ('assignments',)
     #form = ShabbatForm
-    list_display = ('parasha', 'dayt')
+    list_display = ('parasha', 'dayt', 'holiday', 'priorities')
+    list_filter = ('hebrew_year', 'is_hag', 'is_mevarchim', 'is_rosh_chodesh')
+
+    def get_changelist(self, request, **kwargs):
+        return ShabbatChangeList
+
+    def priorities(self, obj):
+        return ', '.join(candidate['name'] + (' (%s)' % candidate['deceased_name'] if 'deceased' in candidate else ' (בר-מצווה)')
+                         for candidate in getattr(obj, 'priority_candidates', ()))
+    priorities.short_description = 'עדיפות לעליות'
 
 
     def XXXformfield_for_manytomany(self, db_field, request, **kwargs):
@@ -86,3 +105,9 @@ class RosterAdmin2(NestedModelAdmin):
 @admin.register(Duty)
 class DutyAdmin(CompareVersionAdmin, NestedModelAdmin):
     list_display = ('name', 'category', 'order_id', 'applicable_for_profile', 'not_applicable_for_roster', 'applicable_for_adults', 'applicable_for_children')
+
+
+@admin.register(TurnStats)
+class TurnStatsAdmin(admin.ModelAdmin):
+    list_display = ('profile', 'duty', 'hebrew_year', 'turns', 'last_served', 'confirmed', 'postponed', 'refusal', 'standin', 'special')
+    list_filter = ('hebrew_year', 'duty')
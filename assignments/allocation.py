@@ -0,0 +1,197 @@
+import heapq
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count
+from parashot.models import Segment
+from users.models import Profile
+from .managers import calendar_fields
+from .models import Assignment, Duty, Roster, TurnStats
+from .priorities import PRIORITY_BAR_MITZVAH, priority_candidates
+
+# The Duty of each segment has the segment's name (e.g. 'ראשון')
+SEGMENT_DUTY_NAMES = dict(Segment.SEGMENT_TYPES)
+
+POOL_COHEN = Profile.PROFILE_TITLE_COHEN
+POOL_LEVI = Profile.PROFILE_TITLE_LEVI
+POOL_YISRAEL = Profile.PROFILE_TITLE_YISRAEL
+POOL_ANY = 'any'
+
+# The titles that can be called up for each segment (the haftorah is open to everyone)
+SEGMENT_TITLES = {
+    Segment.SEGMENT_RISHON: (POOL_COHEN, ),
+    Segment.SEGMENT_SHENI: (POOL_LEVI, ),
+    Segment.SEGMENT_HAFTORAH: (POOL_COHEN, POOL_LEVI, POOL_YISRAEL),
+}
+
+
+# The titles called up for a segment when none of its SEGMENT_TITLES can be, in order
+# (for Sheni, only the Cohen who read Rishon is called up again)
+SEGMENT_FALLBACK_TITLES = {
+    Segment.SEGMENT_RISHON: (POOL_YISRAEL, ),
+    Segment.SEGMENT_SHENI: (POOL_COHEN, POOL_YISRAEL),
+}
+
+
+def segment_titles(segment_type):
+    return SEGMENT_TITLES.get(segment_type, (POOL_YISRAEL, ))
+
+
+class AliyahAllocator(object):
+    """
+    Allocates the aliyot (the Segments of each Shabbat's parasha) of a season of Shabbatot, in date order:
+      - Priority candidates (see assignments.priorities) are called up first: the haftorah if it is free, otherwise a segment
+        their title allows (a bar-mitzvah always gets the haftorah first). These are SPECIAL assignments.
+      - Rishon goes to a Cohen (a Yisrael if there is none), Sheni to a Levi (the same Cohen if there is none),
+        the other aliyot to Yisraelim and the haftorah to anyone (see SEGMENT_TITLES and SEGMENT_FALLBACK_TITLES).
+      - Within each title, the profile who was called up least recently (then least often) is picked, from a heap
+        per title keyed by (last Shabbat served, turns, pk) and seeded from the TurnStats of the recent Hebrew years
+        (see TurnStatsManager.recent_turns). Priority aliyot are SPECIAL, and do not use up a turn.
+    A profile gets at most one aliyah per Shabbat, and Rosters that already have assignments are left as they are.
+    The profiles eligible for the aliyah duties come from the eligibility matrix (see assignments.eligibility); only a bar-mitzvah
+    is called up before he is bar-mitzvahed (never a female profile).
+    """
+    def __init__(self, shabbatot):
+        self.shabbatot = sorted(shabbatot, key=lambda shabbat: shabbat.dayt)
+        self.duties = dict((duty.name, duty) for duty in Duty.objects.filter(name__in=SEGMENT_DUTY_NAMES.values()))
+        self.priorities = priority_candidates(self.shabbatot)
+
+        from .eligibility import eligibility_matrix         # eligibility imports the segment titles from here
+        self.regular = set(pk for duty in self.duties.values() for pk in eligibility_matrix.eligible(duty.pk))
+        others = set(candidate['profile'] for candidates in self.priorities.values() for candidate in candidates
+                     if candidate['reason'] == PRIORITY_BAR_MITZVAH) - self.regular         # Called up for the bar-mitzvah itself
+        titles = ((pk, eligibility_matrix.aliyah_title(pk)) for pk in self.regular | others)
+        self.titles = dict((pk, title) for pk, title in titles if title)
+
+        self.turns = dict((pk, (0, 0)) for pk in self.regular)        # pk: (last Shabbat served (ordinal), number of turns)
+        if self.shabbatot:
+            recent = TurnStats.objects.recent_turns(self.duties.values(), calendar_fields(self.shabbatot[0].dayt)['hebrew_year'])
+            for (pk, duty_id), (last, count) in recent.items():
+                if pk in self.turns:
+                    self.turns[pk] = (max(self.turns[pk][0], last.toordinal() if last else 0), self.turns[pk][1] + count)
+
+        self.heaps = defaultdict(list)
+        for pk in self.regular:
+            self._push(pk)
+        for heap in self.heaps.values():
+            heapq.heapify(heap)
+
+    def _pools(self, pk):
+        title = self.titles[pk] or POOL_YISRAEL
+        return title, POOL_ANY
+
+    def _push(self, pk):
+        last, count = self.turns[pk]
+        for pool in self._pools(pk):
+            self.heaps[pool].append((last, count, pk))
+
+    def _served(self, pk, shabbat):
+        self.turns[pk] = (shabbat.dayt.toordinal(), self.turns[pk][1] + 1)
+        for pool in self._pools(pk):
+            heapq.heappush(self.heaps[pool], self.turns[pk] + (pk, ))
+
+    def _pop(self, pool, used):
+        # Returns the profile in the pool who is next in the rotation and not called up yet this Shabbat (or None)
+        heap = self.heaps[pool]
+        skipped = []
+        found = None
+        while heap:
+            last, count, pk = entry = heapq.heappop(heap)
+            if self.turns[pk] != (last, count):             # Stale entry, pushed again when the profile was served
+                continue
+            if pk in used:
+                skipped.append(entry)
+                continue
+            found = pk
+            skipped.append(entry)                           # Stays in the heap until it is served
+            break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return found
+
+    def _allocate_priorities(self, shabbat, segments, allocated, used):
+        # A bar-mitzvah or yahrzeit is on this Shabbat and not a turn, so it is not recorded in self.turns
+        for candidate in sorted(self.priorities.get(shabbat.pk, ()), key=lambda candidate: candidate['reason'] != PRIORITY_BAR_MITZVAH):
+            pk = candidate['profile']
+            if pk in used or pk not in (self.titles if candidate['reason'] == PRIORITY_BAR_MITZVAH else self.regular):
+                continue
+            title = self.titles[pk] or POOL_YISRAEL
+            for segment in sorted(segments, key=lambda segment: segment != Segment.SEGMENT_HAFTORAH):     # The haftorah first
+                if segment not in allocated and title in segment_titles(segment):
+                    allocated[segment] = (pk, Assignment.OFFER_TYPE_SPECIAL)
+                    used.add(pk)
+                    break
+
+    def _pick(self, segment, allocated, used):
+        # Returns the next profile for a segment, from its titles and then its fallback titles (or None)
+        if segment == Segment.SEGMENT_HAFTORAH:
+            return self._pop(POOL_ANY, used)
+        for title in segment_titles(segment) + SEGMENT_FALLBACK_TITLES.get(segment, ()):
+            if segment == Segment.SEGMENT_SHENI and title == POOL_COHEN:
+                rishon = allocated.get(Segment.SEGMENT_RISHON)
+                pk = rishon[0] if rishon and self.titles[rishon[0]] == POOL_COHEN else None     # No Levi: the Cohen is called up again
+            else:
+                pk = self._pop(title, used)
+            if pk is not None:
+                return pk
+        return None
+
+    def _allocate_regular(self, shabbat, segments, allocated, used):
+        for segment in segments:
+            if segment in allocated:
+                continue
+            pk = self._pick(segment, allocated, used)
+            if pk is None:
+                continue
+            allocated[segment] = (pk, Assignment.OFFER_TYPE_REGULAR)
+            if pk not in used:
+                used.add(pk)
+                self._served(pk, shabbat)
+
+    def plan(self, segments, rosters):
+        """
+        Returns [(roster pk, profile pk, offer type), ...] for the Shabbatot.
+        segments is {parasha pk: [segment type, ...]} and rosters {(shabbat pk, segment type): roster pk} of the empty Rosters
+        """
+        plan = []
+        for shabbat in self.shabbatot:
+            shabbat_segments = [segment for segment in segments.get(shabbat.parasha_id, ()) if (shabbat.pk, segment) in rosters]
+            if not shabbat_segments:
+                continue
+            allocated = {}
+            used = set()
+            self._allocate_priorities(shabbat, shabbat_segments, allocated, used)
+            self._allocate_regular(shabbat, shabbat_segments, allocated, used)
+            for segment, (pk, offer_type) in sorted(allocated.items()):
+                plan.append((rosters[(shabbat.pk, segment)], pk, offer_type))
+        return plan
+
+
+def allocate_aliyot(shabbatot):
+    """
+    Allocates the aliyot of the Shabbatot (see AliyahAllocator) and writes them as OFFERED Assignments with one bulk_create.
+    Missing aliyah Rosters are created. Returns the number of Assignments created
+    """
+    shabbatot = list(shabbatot)
+    allocator = AliyahAllocator(shabbatot)
+    duty_segments = dict((allocator.duties[name].pk, segment) for segment, name in SEGMENT_DUTY_NAMES.items() if name in allocator.duties)
+
+    segments = defaultdict(list)
+    for parasha_id, segment in Segment.objects.filter(parasha__in=set(shabbat.parasha_id for shabbat in shabbatot),
+                                                      segment_type__in=duty_segments.values()).values_list('parasha_id', 'segment_type').distinct():
+        segments[parasha_id].append(segment)
+    for parasha_segments in segments.values():
+        parasha_segments.sort()
+
+    with transaction.atomic():
+        rosters = Roster.objects.filter(shabbat__in=shabbatot, duty__in=duty_segments)
+        existing = set(rosters.values_list('shabbat_id', 'duty_id'))
+        Roster.objects.bulk_create(Roster(shabbat_id=shabbat.pk, duty_id=duty_id) for shabbat in shabbatot for duty_id, segment in duty_segments.items()
+                                   if segment in segments.get(shabbat.parasha_id, ()) and (shabbat.pk, duty_id) not in existing)
+        empty = dict(((shabbat_id, duty_segments[duty_id]), pk) for pk, shabbat_id, duty_id, assigned in
+                     rosters.annotate(assigned=Count('assignments')).values_list('pk', 'shabbat_id', 'duty_id', 'assigned') if not assigned)
+
+        assignments = [Assignment(roster_id=roster_id, profile_id=profile_id, offer_type=offer_type, status=Assignment.STATUS_OFFERED)
+                       for roster_id, profile_id, offer_type in allocator.plan(segments, empty)]
+        Assignment.objects.bulk_create(assignments)
+        TurnStats.objects.refresh_assignments((assignment.profile_id, assignment.roster_id) for assignment in assignments)
+    return len(assignments)
@@ -0,0 +1,147 @@
+import heapq
+from django.db.models import Max, Sum
+from common.utils.cache import ExpiringCache
+from users.models import Profile
+from .allocation import SEGMENT_DUTY_NAMES, SEGMENT_FALLBACK_TITLES, segment_titles
+from .models import Assignment, Duty, TurnStats
+
+STANDIN_CANDIDATES = 5
+STANDIN_MAX_CANDIDATES = 50
+
+
+def _bits(indices):
+    bits = 0
+    for i in indices:
+        bits |= 1 << i
+    return bits
+
+
+class EligibilityMatrix(object):
+    """
+    Which profiles can take each Duty, as a bitset per duty (a Python int) over the indices of the profiles (in pk order).
+    A profile is eligible for:
+      - an aliyah (a Duty named as a Segment) if it is bar-mitzvahed, not female and its title is called up for that segment
+        (see allocation.SEGMENT_TITLES), or, when no profile of those titles is eligible, one of the segment's
+        allocation.SEGMENT_FALLBACK_TITLES (so with no Levi, every Cohen is eligible for Sheni, although the allocator
+        only calls up the Cohen who read Rishon)
+      - any other roster duty if it selected the duty (Profile.duties), and the duty is applicable for adults or children
+        (Profile.bar_mitzvahed)
+    Duties that are not_applicable_for_roster have no eligible profiles. The title of every profile that is not female is kept
+    too (see aliyah_title), as a bar-mitzvah is called up before he is bar-mitzvahed (see allocation.AliyahAllocator).
+    The matrix is built with three queries and cached (see ExpiringCache); it is dropped when a Profile, a Duty or
+    Profile.duties changes (see the signals in assignments.models).
+    """
+    def __init__(self, max_age=300):
+        self._cache = ExpiringCache(self._build, max_age)
+
+    def invalidate(self):
+        self._cache.invalidate()
+
+    def _build(self):
+        profiles = Profile.objects.order_by('pk').only('bar_mitzvahed', 'gender', 'title', '_display_name', 'first_name', 'last_name', 'full_name')
+        names = dict((profile.pk, str(profile)) for profile in profiles)
+        profiles = [(profile.pk, profile.bar_mitzvahed, profile.gender, profile.title) for profile in profiles]
+        pks = [pk for pk, bar_mitzvahed, gender, title in profiles]
+        index = dict((pk, i) for i, pk in enumerate(pks))
+
+        adults = _bits(i for i, (pk, bar_mitzvahed, gender, title) in enumerate(profiles) if bar_mitzvahed)
+        children = _bits(range(len(profiles))) & ~adults
+        not_female = _bits(i for i, (pk, bar_mitzvahed, gender, title) in enumerate(profiles) if gender != Profile.PROFILE_GENDER_FEMALE)
+        titles = {}
+        for i, (pk, bar_mitzvahed, gender, title) in enumerate(profiles):
+            titles[title or Profile.PROFILE_TITLE_YISRAEL] = titles.get(title or Profile.PROFILE_TITLE_YISRAEL, 0) | 1 << i
+        aliyah_titles = dict((pk, title or Profile.PROFILE_TITLE_YISRAEL) for pk, bar_mitzvahed, gender, title in profiles
+                             if gender != Profile.PROFILE_GENDER_FEMALE)
+
+        selected = {}
+        for duty_id, pk in Profile.duties.through.objects.values_list('duty_id', 'profile_id'):
+            if pk in index:
+                selected[duty_id] = selected.get(duty_id, 0) | 1 << index[pk]
+
+        segments = dict((name, segment) for segment, name in SEGMENT_DUTY_NAMES.items())
+        duties = {}
+        for duty in Duty.objects.all():
+            if duty.not_applicable_for_roster:
+                bits = 0
+            elif duty.name in segments:
+                bits = 0
+                for title in segment_titles(segments[duty.name]):
+                    bits |= adults & not_female & titles.get(title, 0)
+                for title in SEGMENT_FALLBACK_TITLES.get(segments[duty.name], ()) if not bits else ():
+                    bits |= adults & not_female & titles.get(title, 0)
+            else:
+                bits = selected.get(duty.pk, 0) & ((adults if duty.applicable_for_adults else 0) | (children if duty.applicable_for_children else 0))
+            duties[duty.pk] = bits
+        return pks, index, duties, names, aliyah_titles
+
+    def matrix(self):
+        """Returns (profile pks, {profile pk: index}, {duty pk: bitset}, {profile pk: name}, {profile pk: aliyah title})"""
+        return self._cache.get()
+
+    def is_eligible(self, duty_id, profile_id):
+        pks, index, duties, names, aliyah_titles = self.matrix()
+        return profile_id in index and bool(duties.get(duty_id, 0) >> index[profile_id] & 1)
+
+    def name(self, profile_id):
+        return self.matrix()[3].get(profile_id, '')
+
+    def aliyah_title(self, profile_id):
+        """Returns the title a profile is called up to the Torah by (None for a female profile)"""
+        return self.matrix()[4].get(profile_id)
+
+    def eligible(self, duty_id):
+        """Returns the pks of the profiles eligible for a duty (in pk order)"""
+        pks, index, duties, names, aliyah_titles = self.matrix()
+        bits = duties.get(duty_id, 0)
+        eligible = []
+        while bits:
+            low = bits & -bits
+            eligible.append(pks[low.bit_length() - 1])
+            bits ^= low
+        return eligible
+
+
+eligibility_matrix = EligibilityMatrix()
+
+
+def roster_candidates(roster):
+    """
+    Returns the profiles eligible for a Roster who are not assigned to it, ranked by fairness: the one who served
+    the duty least recently first (never served first), then by the fewest turns (see TurnStats), as dicts of
+    profile (pk), name, turns and last_served.
+    """
+    assigned = set(roster.assignments.values_list('profile_id', flat=True))
+    pks = [pk for pk in eligibility_matrix.eligible(roster.duty_id) if pk not in assigned]
+    stats = dict((row['profile'], row) for row in TurnStats.objects.filter(duty_id=roster.duty_id, profile__in=pks)
+                 .values('profile').annotate(turns=Sum('turns'), last_served=Max('last_served')).order_by())
+
+    candidates = []
+    for pk in pks:
+        row = stats.get(pk, {})
+        candidates.append({'profile': pk, 'name': eligibility_matrix.name(pk), 'turns': row.get('turns') or 0, 'last_served': row.get('last_served')})
+    candidates.sort(key=lambda candidate: (candidate['last_served'] is not None, candidate['last_served'] or 0, candidate['turns'], candidate['profile']))
+    return candidates
+
+
+def standin_candidates(roster, k=STANDIN_CANDIDATES):
+    """
+    Returns the top k (1 to STANDIN_MAX_CANDIDATES, all if None) stand-in candidates for a Roster: the profiles eligible for
+    its duty who have no assignment on its Shabbat (of any status on the Roster itself), with the fewest turns (of all duties)
+    in the Shabbat's Hebrew year first, then the least recently served. Candidates are dicts of profile (pk), name, turns and
+    last_served. Eligibility comes from the cached matrix, so this takes three queries however many profiles there are.
+    """
+    busy = set(Assignment.objects.filter(roster__shabbat_id=roster.shabbat_id, status__in=(Assignment.STATUS_OFFERED, Assignment.STATUS_CONFIRMED))
+               .values_list('profile_id', flat=True))
+    busy.update(roster.assignments.values_list('profile_id', flat=True))
+    pks = [pk for pk in eligibility_matrix.eligible(roster.duty_id) if pk not in busy]
+    stats = dict((row['profile'], row) for row in TurnStats.objects.filter(hebrew_year=roster.shabbat.hebrew_year, profile__in=pks)
+                 .values('profile').annotate(turns=Sum('turns'), last_served=Max('last_served')).order_by())
+
+    ranked = []
+    for pk in pks:
+        row = stats.get(pk, {})
+        last_served = row.get('last_served')
+        ranked.append(((row.get('turns') or 0, last_served is not None, last_served or 0, pk), pk, row))
+    best = sorted(ranked) if k is None else heapq.nsmallest(max(1, min(k, STANDIN_MAX_CANDIDATES)), ranked)
+    return [{'profile': pk, 'name': eligibility_matrix.name(pk), 'turns': row.get('turns') or 0, 'last_served': row.get('last_served')}
+            for key, pk, row in best]
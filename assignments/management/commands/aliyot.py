@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from ...allocation import allocate_aliyot
+from ...models import Shabbat
+
+
+class Command(BaseCommand):
+    help = 'Allocates the aliyot of the Shabbatot of the specified years (as OFFERED assignments)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('hebrewYear', nargs=1, type=int)
+
+        # Named (optional) arguments
+        parser.add_argument(
+            '--years',
+            type=int,
+            dest='years',
+            default=1,
+            help='Number of years to allocate',
+        )
+
+    def handle(self, *args, **options):
+        hebrew_year = options['hebrewYear'][0]
+        shabbatot = Shabbat.objects.filter(hebrew_year__gte=hebrew_year, hebrew_year__lt=hebrew_year + options['years'])
+        assignments = allocate_aliyot(shabbatot)
+        self.stdout.write(self.style.SUCCESS('Successfully created %s Assignments' % assignments))
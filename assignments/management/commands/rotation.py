@@ -0,0 +1,30 @@
+import datetime
+from django.core.management.base import BaseCommand
+
+from ...models import Duty
+from ...rotation import generate_rosters
+
+
+def _date(value):
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class Command(BaseCommand):
+    help = 'Fills the Rosters of the Shabbatot between two dates (YYYY-MM-DD) by fair rotation (as OFFERED assignments)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', type=_date)
+        parser.add_argument('end', type=_date)
+
+        # Named (optional) arguments
+        parser.add_argument(
+            '--duty',
+            action='append',
+            dest='duties',
+            help='Name of a Duty to fill (all the roster duties by default)',
+        )
+
+    def handle(self, *args, **options):
+        duties = Duty.objects.filter(name__in=options['duties']) if options['duties'] else None
+        assignments = generate_rosters(options['start'], options['end'], duties)
+        self.stdout.write(self.style.SUCCESS('Successfully created %s Assignments' % assignments))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Shabbat
+
+
+class Command(BaseCommand):
+    help = 'Creates the Shabbatot (with their Parasha and Rosters) for the specified years'
+
+    def add_arguments(self, parser):
+        parser.add_argument('hebrewYear', nargs=1, type=int)
+
+        # Named (optional) arguments
+        parser.add_argument(
+            '--years',
+            type=int,
+            dest='years',
+            default=1,
+            help='Number of years to create',
+        )
+        parser.add_argument(
+            '--diaspora',
+            action='store_true',
+            dest='diaspora',
+            default=None,
+            help='Set to True for diaspora (defaults to settings.DIASPORA)',
+        )
+
+    def handle(self, *args, **options):
+        shabbatot, rosters = Shabbat.objects.seed(options['hebrewYear'][0], options['years'], options['diaspora'])
+        self.stdout.write(self.style.SUCCESS('Successfully created %s Shabbatot and %s Rosters' % (shabbatot, rosters)))
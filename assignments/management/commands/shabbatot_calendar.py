@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Shabbat
+
+
+class Command(BaseCommand):
+    help = 'Fills in the Hebrew date and calendar columns of the existing Shabbatot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--diaspora',
+            action='store_true',
+            dest='diaspora',
+            default=None,
+            help='Set to True for diaspora (defaults to settings.DIASPORA)',
+        )
+
+    def handle(self, *args, **options):
+        updated = Shabbat.objects.update_calendar_fields(options['diaspora'])
+        self.stdout.write(self.style.SUCCESS('Successfully updated %s Shabbatot' % updated))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ...models import TurnStats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the turn counters (TurnStats) of all the profiles from the Assignments'
+
+    def handle(self, *args, **options):
+        rows = TurnStats.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS('Successfully rebuilt %s TurnStats' % rows))
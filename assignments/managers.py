@@ -0,0 +1,216 @@
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, Max, Prefetch, Sum
+from common.date_utils import calendar_util
+from common.jewish_dates.dates import CHOL_HAMOED, HACHODESH, HAG, MEVARCHIM, PARAH, ROSH_CHODESH, SHEKALIM, ZACHOR
+from common.jewish_dates.dates import classify_dates, get_special_tags, get_special_tags_jd, iter_hebrew_years
+from common.jewish_dates.hebrew_year import weekday
+from common.jewish_dates.holidays import get_hag_jd
+from parashot.names import get_yom_tov_reading
+from parashot.resolver import parasha_resolver
+
+# The rotations rank profiles by the turns they took in this many Hebrew years (the current one included, see TurnStatsManager.recent_turns)
+RECENT_TURN_YEARS = 2
+
+# The Shabbat flag column of every special-Shabbat tag
+SPECIAL_TAG_FIELDS = (
+    (HAG, 'is_hag'),
+    (CHOL_HAMOED, 'is_chol_hamoed'),
+    (ROSH_CHODESH, 'is_rosh_chodesh'),
+    (MEVARCHIM, 'is_mevarchim'),
+    (SHEKALIM, 'is_shekalim'),
+    (ZACHOR, 'is_zachor'),
+    (PARAH, 'is_parah'),
+    (HACHODESH, 'is_hachodesh'),
+)
+
+
+def _diaspora(diaspora):
+    return settings.DIASPORA if diaspora is None else diaspora
+
+
+def calendar_fields(dayt, diaspora=None):
+    """Returns {field name: value} of the denormalized calendar columns of a Shabbat on dayt (a datetime.date)"""
+    diaspora = _diaspora(diaspora)
+    jd = calendar_util.gregorian_to_jd(dayt.year, dayt.month, dayt.day)
+    year, month, day = calendar_util.jd_to_hebrew(jd)
+    tags = get_special_tags_jd(jd, diaspora)
+    fields = {
+        'hebrew_year': year,
+        'hebrew_month': month,
+        'hebrew_day': day,
+        'julian_day': int(jd),
+        'holiday': get_hag_jd(jd, weekday(jd) == 6, diaspora),
+    }
+    fields.update((field, tag in tags) for tag, field in SPECIAL_TAG_FIELDS)
+    return fields
+
+
+class ShabbatQuerySet(models.QuerySet):
+    def special_tags(self, diaspora=None):
+        """Returns {shabbat pk: frozenset of special-Shabbat tags} for all the Shabbatot in the queryset"""
+        days = dict(self.values_list('pk', 'dayt'))
+        tags = classify_dates(set(days.values()), _diaspora(diaspora))
+        return {pk: tags[dayt] for pk, dayt in days.items()}
+
+    def applicable_duties(self, diaspora=None, duties=None):
+        """
+        Returns {shabbat pk: [Duty, ...]} with the duties needed on each Shabbat (or weekday yom tov) in the queryset (in Duty order).
+        Duties are read with a single query, and each Hebrew year of the calendar is computed once.
+        """
+        if duties is None:
+            Duty = self.model._meta.get_field('duties').related_model
+            duties = Duty.objects.filter(not_applicable_for_roster=False)
+        duties = list(duties)
+        days = dict(self.values_list('pk', 'dayt'))
+        tags = classify_dates(set(days.values()), _diaspora(diaspora))
+        by_tags = {}
+        applicable = {}
+        for pk, dayt in days.items():
+            key = (tags[dayt], dayt.weekday() == 5)         # Saturday
+            if key not in by_tags:
+                by_tags[key] = [duty for duty in duties if duty.is_applicable(*key)]
+            applicable[pk] = by_tags[key]
+        return applicable
+
+    def with_rosters(self):
+        """
+        Fetches the Parasha, the Rosters with their Duty, and the Rosters' Assignments along with the Shabbatot, so serializing
+        them (see ShabbatSerializer) takes three queries however many Shabbatot, Rosters and Assignments there are
+        """
+        Roster = self.model.duties.through
+        Assignment = Roster._meta.get_field('assignments').related_model
+        rosters = Roster.objects.select_related('duty').order_by('duty__order_id').prefetch_related(Prefetch('assignments', queryset=Assignment.objects.order_by('pk')))
+        return self.select_related('parasha').prefetch_related(Prefetch('roster_set', queryset=rosters))
+
+    def update_calendar_fields(self, diaspora=None):
+        """
+        Recomputes the denormalized calendar columns of the Shabbatot in the queryset (e.g. after changing settings.DIASPORA,
+        or for rows written by queryset.update()). Only rows whose columns changed are written, in one transaction.
+        Returns the number of Shabbatot updated
+        """
+        names = ['hebrew_year', 'hebrew_month', 'hebrew_day', 'julian_day', 'holiday'] + [field for tag, field in SPECIAL_TAG_FIELDS]
+        updated = 0
+        with transaction.atomic():
+            for row in self.values('pk', 'dayt', *names):
+                fields = calendar_fields(row['dayt'], diaspora)
+                if any(row[name] != fields[name] for name in names):
+                    self.model._default_manager.filter(pk=row['pk']).update(**fields)
+                    updated += 1
+        return updated
+
+
+class ShabbatManager(models.Manager.from_queryset(ShabbatQuerySet)):
+    def seed(self, hebrew_year, years=1, diaspora=None):
+        """
+        Creates the Shabbatot and the weekday yamim tovim of a number of Hebrew years, linked to their Parasha (a weekday
+        yom tov to its holiday reading, see parashot.names.YOM_TOV_READINGS), with a Roster for every applicable Duty.
+        Everything is written with bulk_create in one transaction, and Shabbatot/Rosters that already exist are kept,
+        so running it again only fills in what is missing.
+        Returns (number of Shabbatot created, number of Rosters created)
+        """
+        diaspora = _diaspora(diaspora)
+        Roster = self.model.duties.through
+        Duty = Roster._meta.get_field('duty').related_model
+
+        days = [day._replace(parasha_ids=day.parasha_ids or get_yom_tov_reading(day.holiday, day.hebrew_date[2]))
+                for day in iter_hebrew_years(hebrew_year, years, diaspora)]
+        days = [day for day in days if day.parasha_ids]
+        dates = [day.date for day in days]
+
+        with transaction.atomic():
+            parashot = parasha_resolver.get_many((day.parasha_ids for day in days), create=True)     # Creates holiday readings and rare combinations
+
+            existing = set(self.filter(dayt__in=dates).values_list('dayt', flat=True))
+            new_shabbatot = [self.model(dayt=day.date, parasha=parashot[day.parasha_ids], **calendar_fields(day.date, diaspora))
+                             for day in days if day.date not in existing]
+            self.bulk_create(new_shabbatot)
+
+            shabbatot = dict(self.filter(dayt__in=dates).values_list('dayt', 'pk'))
+            existing = set(Roster.objects.filter(shabbat_id__in=shabbatot.values()).values_list('shabbat_id', 'duty_id'))
+            duties = list(Duty.objects.filter(not_applicable_for_roster=False))
+            new_rosters = []
+            for day in days:
+                shabbat_id = shabbatot[day.date]
+                tags = get_special_tags(day.date, diaspora)
+                for duty in duties:
+                    if duty.is_applicable(tags, day.date.weekday() == 5) and (shabbat_id, duty.pk) not in existing:
+                        new_rosters.append(Roster(shabbat_id=shabbat_id, duty=duty))
+            Roster.objects.bulk_create(new_rosters)
+
+        return len(new_shabbatot), len(new_rosters)
+
+
+class TurnStatsManager(models.Manager):
+    def _counters(self, rows):
+        # rows of (profile pk, duty pk, hebrew year, status, offer type, number of assignments, last Shabbat) to {key: {field: value}}
+        from .models import Assignment
+        stats = {}
+        for profile_id, duty_id, hebrew_year, status, offer_type, count, last in rows:
+            if hebrew_year is None:                 # Shabbat without calendar columns (see ShabbatQuerySet.update_calendar_fields)
+                continue
+            fields = stats.setdefault((profile_id, duty_id, hebrew_year), {'last_served': None, 'turns': 0})
+            fields[status.lower()] = fields.get(status.lower(), 0) + count
+            fields[offer_type.lower()] = fields.get(offer_type.lower(), 0) + count
+            if offer_type == Assignment.OFFER_TYPE_REGULAR and status in Assignment.TURN_STATUSES:
+                fields['turns'] += count
+                fields['last_served'] = max(fields['last_served'] or last, last)
+        return stats
+
+    def _grouped(self, assignments):
+        return assignments.values_list('profile_id', 'roster__duty_id', 'roster__shabbat__hebrew_year', 'status', 'offer_type') \
+            .annotate(count=Count('pk'), last=Max('roster__shabbat__dayt')).order_by()
+
+    def _new(self, key, fields):
+        profile_id, duty_id, hebrew_year = key
+        return self.model(profile_id=profile_id, duty_id=duty_id, hebrew_year=hebrew_year, **fields)
+
+    def rebuild(self):
+        """Recomputes all the TurnStats from the Assignments (one aggregate query and one bulk_create). Returns the number of rows"""
+        from .models import Assignment
+        stats = self._counters(self._grouped(Assignment.objects.all()))
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(self._new(key, fields) for key, fields in stats.items())
+        return len(stats)
+
+    def refresh(self, keys):
+        """Recomputes the TurnStats of (profile pk, duty pk, hebrew year) keys from their Assignments"""
+        from .models import Assignment
+        keys = set(keys)
+        if not keys:
+            return
+        profiles, duties, years = (set(column) for column in zip(*keys))
+        assignments = Assignment.objects.filter(profile__in=profiles, roster__duty__in=duties, roster__shabbat__hebrew_year__in=years)
+        stats = dict((key, fields) for key, fields in self._counters(self._grouped(assignments)).items() if key in keys)
+        empty = dict((field.name, field.get_default()) for field in self.model._meta.concrete_fields
+                     if field.name not in ('id', 'profile', 'duty', 'hebrew_year'))
+
+        with transaction.atomic():
+            existing = dict(((row.profile_id, row.duty_id, row.hebrew_year), row.pk)
+                            for row in self.filter(profile__in=profiles, duty__in=duties, hebrew_year__in=years) if (row.profile_id, row.duty_id, row.hebrew_year) in keys)
+            for key, pk in existing.items():
+                if key in stats:
+                    self.filter(pk=pk).update(**dict(empty, **stats[key]))
+                else:
+                    self.filter(pk=pk).delete()
+            self.bulk_create(self._new(key, fields) for key, fields in stats.items() if key not in existing)
+
+    def recent_turns(self, duties, hebrew_year, years=RECENT_TURN_YEARS):
+        """
+        Returns {(profile pk, duty pk): (last Shabbat served, number of turns)} of the turns taken in the duties since the
+        Hebrew year years-1 before hebrew_year (later years included), read from the TurnStats with one query
+        """
+        rows = self.filter(duty__in=duties, hebrew_year__gt=hebrew_year - years, turns__gt=0).values_list('profile_id', 'duty_id') \
+            .annotate(last=Max('last_served'), count=Sum('turns')).order_by()
+        return dict(((profile_id, duty_id), (last, count)) for profile_id, duty_id, last, count in rows)
+
+    def refresh_assignments(self, assignments):
+        """Recomputes the TurnStats of (profile pk, roster pk) pairs, e.g. after bulk_create() of Assignments (which sends no signals)"""
+        from .models import Roster
+        assignments = set((profile_id, roster_id) for profile_id, roster_id in assignments if profile_id and roster_id)
+        if not assignments:
+            return
+        rosters = dict((pk, (duty_id, hebrew_year)) for pk, duty_id, hebrew_year in
+                       Roster.objects.filter(pk__in=set(roster_id for profile_id, roster_id in assignments)).values_list('pk', 'duty_id', 'shabbat__hebrew_year'))
+        self.refresh((profile_id,) + rosters[roster_id] for profile_id, roster_id in assignments if roster_id in rosters)
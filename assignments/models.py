@@ -1,7 +1,11 @@
 import reversion
 from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+from common.jewish_dates.dates import HAG, MEVARCHIM
+from .managers import ShabbatManager, TurnStatsManager, calendar_fields
 from parashot.models import Parasha
-from users.models import Profile
+from users.models import Family, Profile
 
 
 class Duty(models.Model):
@@ -31,21 +35,58 @@ class Duty(models.Model):
         #return "%s-%s" % (self.category, self.name)
         return self.name
 
+    def is_applicable(self, tags, shabbat=True):
+        """
+        Whether the duty is needed on a Shabbat with these special-Shabbat tags (see common.jewish_dates.dates).
+        On a weekday yom tov (shabbat False) only the applicable_for_hag duties are needed
+        """
+        if self.not_applicable_for_roster:
+            return False
+        return (self.applicable_for_shabbat and shabbat) or (self.applicable_for_hag and HAG in tags) or (self.applicable_for_mevarchim and MEVARCHIM in tags)
+
 
 class Shabbat(models.Model):
     """
     A specific shabbat/hag
     """
+    objects = ShabbatManager()
+
     dayt = models.DateField(unique=True, blank=False, null=False, verbose_name='תאריך')     # intentional mispelling to overcome reserved word
     parasha = models.ForeignKey(Parasha, related_name='shabbats', verbose_name='פרשה')
     duties = models.ManyToManyField(Duty, through='Roster', verbose_name='תפקידים')#, related_name='Shabbats')
 
+    # Calendar columns derived from dayt (see managers.calendar_fields), so the calendar can be queried in SQL.
+    # They are set on save() and by seed(); rows written otherwise are fixed with Shabbat.objects.update_calendar_fields()
+    hebrew_year = models.PositiveSmallIntegerField(null=True, editable=False)
+    hebrew_month = models.PositiveSmallIntegerField(null=True, db_index=True, editable=False)     # 1=Nisan, 7=Tishrei, 12=Adar (Adar I), 13=Adar II
+    hebrew_day = models.PositiveSmallIntegerField(null=True, editable=False)
+    julian_day = models.IntegerField(null=True, db_index=True, editable=False)    # calendar_util julian date - 0.5
+    holiday = models.CharField(max_length=30, blank=True, db_index=True, editable=False)     # Yom tov name (holidays.*), '' if none
+    is_hag = models.BooleanField(default=False, db_index=True, editable=False)
+    is_chol_hamoed = models.BooleanField(default=False, db_index=True, editable=False)
+    is_rosh_chodesh = models.BooleanField(default=False, db_index=True, editable=False)
+    is_mevarchim = models.BooleanField(default=False, db_index=True, editable=False)
+    is_shekalim = models.BooleanField(default=False, editable=False)
+    is_zachor = models.BooleanField(default=False, editable=False)
+    is_parah = models.BooleanField(default=False, editable=False)
+    is_hachodesh = models.BooleanField(default=False, editable=False)
+
     class Meta:
         verbose_name_plural = 'Shabbatot'
+        index_together = (('hebrew_year', 'hebrew_month', 'hebrew_day'),)
 
     def __str__(self):
         return "%s %s (#%s)" % (self.dayt, self.parasha, self.id)
 
+    def set_calendar_fields(self, diaspora=None):
+        for name, value in calendar_fields(self.dayt, diaspora).items():
+            setattr(self, name, value)
+
+    def save(self, *args, **kwargs):
+        if self.dayt:
+            self.set_calendar_fields()
+        super(Shabbat, self).save(*args, **kwargs)
+
 
 class Roster(models.Model):
     shabbat = models.ForeignKey(Shabbat) #, related_name='roster')
@@ -54,7 +95,7 @@ class Roster(models.Model):
 
     def __str__(self):
         #return "Assignment (#%s): %s>%s/%s" % (self.id, self.get_tafkid_display(), self.user, self.get_status_display())
-        return "%s>%s (#%s)" % (self.duty.name, self.profiless.count(), self.id)
+        return "%s>%s (#%s)" % (self.duty.name, self.assignments.count(), self.id)
 
     class Meta:
         unique_together = (('duty', 'shabbat'),)
@@ -86,6 +127,9 @@ class Assignment(models.Model):
         (OFFER_TYPE_SPECIAL, 'מיוחד'),  # Simcha - Is not counted as a 'turn'
     )
 
+    # A REGULAR assignment with one of these statuses is a turn (a REFUSAL skips the turn, so the profile waits for the next round)
+    TURN_STATUSES = (STATUS_OFFERED, STATUS_CONFIRMED, STATUS_REFUSAL)
+
     roster = models.ForeignKey(Roster, related_name='assignments')
     profile = models.ForeignKey(Profile, related_name='assignments')
     status = models.CharField(max_length=10, choices=STATUS_TYPES, default=STATUS_OFFERED)
@@ -98,3 +142,69 @@ class Assignment(models.Model):
     def __str__(self):
         #return "Assignment (#%s): %s>%s/%s" % (self.id, self.get_tafkid_display(), self.user, self.get_status_display())
         return "%s>%s/%s (#%s)" % (self.roster, self.profile, self.get_status_display(), self.id)
+
+    @property
+    def is_turn(self):
+        return self.offer_type == self.OFFER_TYPE_REGULAR and self.status in self.TURN_STATUSES
+
+
+class TurnStats(models.Model):
+    """
+    Assignment counters of a profile for a duty in a Hebrew year (maintained by the Assignment signals below, see TurnStatsManager)
+    """
+    profile = models.ForeignKey(Profile, related_name='turn_stats')
+    duty = models.ForeignKey(Duty, related_name='turn_stats')
+    hebrew_year = models.PositiveSmallIntegerField()
+
+    offered = models.PositiveIntegerField(default=0)
+    confirmed = models.PositiveIntegerField(default=0)
+    postponed = models.PositiveIntegerField(default=0)
+    refusal = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    regular = models.PositiveIntegerField(default=0)
+    standin = models.PositiveIntegerField(default=0)
+    special = models.PositiveIntegerField(default=0)
+    turns = models.PositiveIntegerField(default=0)                  # See Assignment.is_turn
+    last_served = models.DateField(null=True, blank=True)           # The Shabbat of the last turn
+
+    objects = TurnStatsManager()
+
+    class Meta:
+        unique_together = (('profile', 'duty', 'hebrew_year'),)
+        ordering = ['hebrew_year', 'duty', 'profile']
+        verbose_name_plural = 'Turn stats'
+
+    def __str__(self):
+        return "%s>%s/%s: %s (#%s)" % (self.duty, self.profile, self.hebrew_year, self.turns, self.id)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(m2m_changed, sender=Family.parents.through)
+@receiver(m2m_changed, sender=Family.children.through)
+def invalidate_priority_index(sender, **kwargs):
+    from .priorities import priority_index
+    priority_index.invalidate()
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=Duty)
+@receiver(post_delete, sender=Duty)
+@receiver(m2m_changed, sender=Profile.duties.through)
+def invalidate_eligibility_matrix(sender, **kwargs):
+    from .eligibility import eligibility_matrix
+    eligibility_matrix.invalidate()
+
+
+@receiver(post_init, sender=Assignment)
+def remember_turn_stats_key(sender, instance, **kwargs):
+    # The profile and roster the instance was loaded with, whose stats change too if they are edited
+    instance._turn_stats_origin = (instance.__dict__.get('profile_id'), instance.__dict__.get('roster_id'))
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def update_turn_stats(sender, instance, **kwargs):
+    TurnStats.objects.refresh_assignments([(instance.profile_id, instance.roster_id), instance._turn_stats_origin])
+    instance._turn_stats_origin = (instance.profile_id, instance.roster_id)
@@ -0,0 +1,75 @@
+from common.utils.cache import ExpiringCache
+from users.models import Family, Profile
+from users.yahrzeits import yahrzeit_index
+
+PRIORITY_YAHRZEIT = 'yahrzeit'
+PRIORITY_BAR_MITZVAH = 'bar_mitzvah'
+
+
+class PriorityIndex(object):
+    """
+    Cached indexes of the profiles with a priority for aliyot (other than the yahrzeit dates, see users.yahrzeits):
+    the profiles of every bar-mitzvah parasha, and the children who observe the yahrzeit of each deceased parent.
+    Each is read with one query and cached (see ExpiringCache); both are dropped when a Profile or a Family changes
+    (see the signals in assignments.models).
+    """
+    def __init__(self, max_age=300):
+        self._bar_mitzvah = ExpiringCache(self._read_bar_mitzvah, max_age)
+        self._mourners = ExpiringCache(self._read_mourners, max_age)
+
+    def invalidate(self):
+        self._bar_mitzvah.invalidate()
+        self._mourners.invalidate()
+
+    def _read_bar_mitzvah(self):
+        index = {}
+        for pk, parasha_id in Profile.objects.filter(bar_mitzvah_parasha__isnull=False).values_list('pk', 'bar_mitzvah_parasha').order_by('pk'):
+            index.setdefault(parasha_id, []).append(pk)
+        return index
+
+    def _read_mourners(self):
+        index = {}
+        rows = Family.objects.filter(parents__dod_month__isnull=False, children__isnull=False).values_list('parents', 'children').distinct()
+        for parent, child in sorted(rows):
+            index.setdefault(parent, []).append(child)
+        return index
+
+    def bar_mitzvah(self):
+        """Returns {parasha pk: [profile pk, ...]}"""
+        return self._bar_mitzvah.get()
+
+    def mourners(self):
+        """Returns {deceased profile pk: [child profile pk, ...]} for the profiles with a yahrzeit"""
+        return self._mourners.get()
+
+
+priority_index = PriorityIndex()
+
+
+def priority_candidates(shabbatot):
+    """
+    Returns {shabbat pk: [candidate, ...]} of the profiles with a priority for aliyot on each Shabbat: those observing a yahrzeit
+    in the week from the Shabbat (see YahrzeitIndex.for_shabbat), then those whose bar-mitzvah parasha is read.
+    A candidate is a dict of profile (pk), name, reason (PRIORITY_*) and, for a yahrzeit, deceased (pk) and deceased_name.
+    The indexes are cached, so a page of Shabbatot costs one query (for the names).
+    """
+    bar_mitzvah = priority_index.bar_mitzvah()
+    mourners = priority_index.mourners()
+
+    found = {}
+    for shabbat in shabbatot:
+        found[shabbat.pk] = [(child, PRIORITY_YAHRZEIT, deceased) for deceased in yahrzeit_index.for_shabbat(shabbat.dayt) for child in mourners.get(deceased, ())]
+        found[shabbat.pk] += [(pk, PRIORITY_BAR_MITZVAH, None) for pk in bar_mitzvah.get(shabbat.parasha_id, ())]
+
+    pks = set(pk for candidates in found.values() for candidate in candidates for pk in (candidate[0], candidate[2]) if pk)
+    names = dict((profile.pk, str(profile)) for profile in Profile.objects.filter(pk__in=pks)) if pks else {}
+
+    candidates = {}
+    for shabbat_pk, shabbat_candidates in found.items():
+        candidates[shabbat_pk] = []
+        for pk, reason, deceased in shabbat_candidates:
+            candidate = {'profile': pk, 'name': names.get(pk, ''), 'reason': reason}
+            if deceased:
+                candidate.update(deceased=deceased, deceased_name=names.get(deceased, ''))
+            candidates[shabbat_pk].append(candidate)
+    return candidates
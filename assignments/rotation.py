@@ -0,0 +1,91 @@
+import heapq
+from collections import defaultdict
+from django.db import transaction
+from .eligibility import eligibility_matrix
+from .managers import calendar_fields
+from .models import Assignment, Duty, Roster, TurnStats
+
+# A Roster is filled when it has an assignment with one of these statuses
+FILLED_STATUSES = (Assignment.STATUS_OFFERED, Assignment.STATUS_CONFIRMED)
+
+
+class DutyRotation(object):
+    """
+    The rotation of one Duty: the profiles eligible for it, in a heap keyed by (last Shabbat served, pk),
+    so the profile who waited longest is next. Entries are replaced lazily when a profile is served.
+    """
+    def __init__(self, pks, last_served):
+        self.last_served = dict((pk, last_served.get(pk, 0)) for pk in pks)     # pk: ordinal of the last Shabbat served
+        self.heap = [(last, pk) for pk, last in self.last_served.items()]
+        heapq.heapify(self.heap)
+
+    def next(self, excluded):
+        """Returns the profile who waited longest, other than the excluded pks (None if there is none)"""
+        skipped = []
+        found = None
+        while self.heap:
+            last, pk = entry = heapq.heappop(self.heap)
+            if self.last_served[pk] != last:                # Stale entry
+                continue
+            skipped.append(entry)
+            if pk not in excluded:
+                found = pk
+                break
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        return found
+
+    def served(self, pk, dayt):
+        self.last_served[pk] = dayt.toordinal()
+        heapq.heappush(self.heap, (self.last_served[pk], pk))
+
+
+def generate_rosters(start, end, duties=None):
+    """
+    Fills every unfilled Roster of the duties on the Shabbatot from start to end (datetime.date, inclusive) with one profile,
+    in date and Duty order, from the rotation of its Duty (see DutyRotation):
+      - The last turn (see Assignment.is_turn) of every (duty, profile) is read from the TurnStats of the recent Hebrew years
+        (see TurnStatsManager.recent_turns), and only the Assignments of the Rosters from start to end are read.
+      - A profile who POSTPONED or REFUSED a Roster is not offered it again, and a profile gets one new duty per Shabbat at most.
+      - The eligible profiles of each duty are read from the cached eligibility matrix (see eligibility.EligibilityMatrix).
+    All the new Assignments are written as OFFERED with one bulk_create. Returns the number of Assignments created
+    """
+    if duties is None:
+        duties = Duty.objects.filter(not_applicable_for_roster=False)
+    duties = dict((duty.pk, duty) for duty in duties)
+
+    last_served = defaultdict(dict)         # duty pk: {profile pk: ordinal of the last Shabbat served}
+    for (pk, duty_id), (last, count) in TurnStats.objects.recent_turns(duties, calendar_fields(start)['hebrew_year']).items():
+        if last:
+            last_served[duty_id][pk] = last.toordinal()
+
+    filled = set()                          # Roster pks
+    excluded = defaultdict(set)             # Roster pk: profile pks
+    busy = defaultdict(set)                 # Shabbat pk: profile pks with a duty on that Shabbat
+    current = Assignment.objects.filter(roster__duty__in=duties, roster__shabbat__dayt__gte=start, roster__shabbat__dayt__lte=end) \
+        .values_list('roster_id', 'roster__shabbat_id', 'profile_id', 'status')
+    for roster_id, shabbat_id, pk, status in current:
+        if status in FILLED_STATUSES:
+            filled.add(roster_id)
+            busy[shabbat_id].add(pk)
+        excluded[roster_id].add(pk)
+
+    rotations = dict((duty_id, DutyRotation(eligibility_matrix.eligible(duty_id), last_served[duty_id])) for duty_id in duties)
+    rosters = Roster.objects.filter(shabbat__dayt__gte=start, shabbat__dayt__lte=end, duty__in=duties) \
+        .order_by('shabbat__dayt', 'duty__order_id').values_list('pk', 'duty_id', 'shabbat_id', 'shabbat__dayt')
+
+    assignments = []
+    for roster_id, duty_id, shabbat_id, dayt in rosters:
+        if roster_id in filled:
+            continue
+        pk = rotations[duty_id].next(excluded[roster_id] | busy[shabbat_id])
+        if pk is None:
+            continue
+        rotations[duty_id].served(pk, dayt)
+        busy[shabbat_id].add(pk)
+        assignments.append(Assignment(roster_id=roster_id, profile_id=pk, status=Assignment.STATUS_OFFERED, offer_type=Assignment.OFFER_TYPE_REGULAR))
+
+    with transaction.atomic():
+        Assignment.objects.bulk_create(assignments)
+        TurnStats.objects.refresh_assignments((assignment.profile_id, assignment.roster_id) for assignment in assignments)
+    return len(assignments)
@@ -1,6 +1,7 @@
 from parashot.serializers import ParashaSerializer
 from rest_framework import serializers
 from .models import Duty, Shabbat, Assignment, Roster
+from .priorities import priority_candidates
 
 
 class DutySerializer(serializers.ModelSerializer):
@@ -57,14 +58,30 @@ class ShabbatUpdateSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class ShabbatListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # The priority candidates of all the Shabbatot (of the page) are computed together
+        shabbatot = list(data.all() if hasattr(data, 'all') else data)
+        self.context['priority_candidates'] = priority_candidates(shabbatot)
+        return super().to_representation(shabbatot)
+
+
 class ShabbatSerializer(serializers.ModelSerializer):
     #duties = DutySerializer(many=True, read_only=True)
     parasha = ParashaSerializer()
     roster = RosterSerializer(source='roster_set', many=True)
     date = serializers.DateField(source='dayt')
+    priority_candidates = serializers.SerializerMethodField()
 
     class Meta:
         model = Shabbat
         fields = '__all__'
-        fields = ('url', 'parasha', 'date', 'roster')
+        fields = ('url', 'parasha', 'date', 'roster', 'priority_candidates')
+        list_serializer_class = ShabbatListSerializer
+
+    def get_priority_candidates(self, obj):
+        candidates = self.context.get('priority_candidates')
+        if candidates is None or obj.pk not in candidates:
+            candidates = priority_candidates([obj])
+        return candidates[obj.pk]
 
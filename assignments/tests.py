@@ -1,12 +1,19 @@
+from django.db import connection
 from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIRequestFactory, APIClient
 from rest_framework.authtoken.models import Token
 #from guardian.shortcuts import assign_perm, get_perms
 from parashot.models import Parasha
-from .models import Duty, Shabbat, Assignment, Roster
-from users.models import Family, User
+from .models import Duty, Shabbat, Assignment, Roster, TurnStats
+from .serializers import ShabbatSerializer
+from users.models import Family, Profile, User
+from .allocation import allocate_aliyot
+from .eligibility import EligibilityMatrix, eligibility_matrix
+from .rotation import generate_rosters
+from .priorities import priority_candidates, PRIORITY_BAR_MITZVAH, PRIORITY_YAHRZEIT
 import datetime
 
 
@@ -365,3 +372,342 @@ class AssignmentTestCase(TransactionTestCase):
         #print(response.content)
         #self.assertEqual(response.content, b'[{"url":"http://testserver/api/shabbats/2/","parasha":{"id":2,"name":"\xd7\x91\xd7\xa8\xd7\x90\xd7\xa9\xd7\x99\xd7\xaa"},"dayt":"2017-09-20","roster":[]}]')
         #self.assertEqual(response.content, b'[{"url":"http://testserver/api/shabbat/1/","parasha":{"url":"http://testserver/api/parasha/1/","name":"\xd7\x91\xd7\xa8\xd7\x90\xd7\xa9\xd7\x99\xd7\xaa"},"dayt":"2017-09-19","roster":[]}]')
+
+
+class ShabbatSeedTestCase(TransactionTestCase):
+    fixtures = ['duties', 'torahParasha']
+
+    def test_seed(self):
+        hag = Duty.objects.create(category='תפילה', name='הלל', order_id=100, applicable_for_shabbat=False, applicable_for_hag=True)
+        shabbatot, rosters = Shabbat.objects.seed(5778)
+        self.assertEqual(shabbatot, Shabbat.objects.count())
+        self.assertEqual(rosters, Roster.objects.count())
+        self.assertEqual(Shabbat.objects.get(dayt=datetime.date(2017, 10, 14)).parasha.name, 'בראשית')
+        self.assertEqual(Shabbat.objects.get(dayt=datetime.date(2018, 3, 10)).parasha.name, 'ויקהל-פקודי')
+        self.assertEqual(Shabbat.objects.get(dayt=datetime.date(2017, 9, 30)).parasha.name, 'יום כיפור')     # Created for the holiday
+        self.assertFalse(Roster.objects.filter(duty__not_applicable_for_roster=True).exists())
+
+        rosh_hashana = Shabbat.objects.get(dayt=datetime.date(2017, 9, 21))          # Weekday yom tov (Thursday)
+        self.assertEqual((rosh_hashana.parasha.name, rosh_hashana.holiday, rosh_hashana.is_hag), ('ראש השנה', 'RoshHashana', True))
+        self.assertEqual(list(Roster.objects.filter(shabbat=rosh_hashana).values_list('duty', flat=True)), [hag.pk])     # Only the hag duties
+        self.assertEqual(Shabbat.objects.get(dayt=datetime.date(2018, 5, 20)).parasha.name, 'שבועות')
+
+        self.assertEqual(Shabbat.objects.seed(5778), (0, 0))                            # Idempotent
+        self.assertEqual(Shabbat.objects.seed(5778, 2)[0], Shabbat.objects.count() - shabbatot)
+
+
+class SpecialShabbatTestCase(TransactionTestCase):
+    fixtures = ['duties', 'torahParasha']
+
+    def test_applicable_duties(self):
+        mevarchim = Duty.objects.create(category='תפילה', name='ברכת החודש', order_id=100, applicable_for_shabbat=False, applicable_for_mevarchim=True)
+        hag = Duty.objects.create(category='תפילה', name='הלל', order_id=101, applicable_for_shabbat=False, applicable_for_hag=True)
+        regular = Shabbat.objects.create(dayt=datetime.date(2018, 2, 24), parasha=Parasha.objects.get(name='תצווה'))
+        mevarchim_shabbat = Shabbat.objects.create(dayt=datetime.date(2018, 3, 10), parasha=Parasha.objects.get(name='ויקהל-פקודי'))
+        hag_shabbat = Shabbat.objects.create(dayt=datetime.date(2018, 3, 31), parasha=Parasha.objects.get_or_create(name='פסח')[0])
+
+        tags = Shabbat.objects.all().special_tags()
+        self.assertEqual(tags[regular.pk], frozenset(['zachor']))
+        self.assertEqual(tags[mevarchim_shabbat.pk], frozenset(['mevarchim', 'parah']))
+        self.assertEqual(tags[hag_shabbat.pk], frozenset(['hag']))
+
+        with self.assertNumQueries(2):
+            duties = Shabbat.objects.all().applicable_duties()
+        self.assertNotIn(mevarchim, duties[regular.pk])
+        self.assertNotIn(hag, duties[regular.pk])
+        self.assertIn(mevarchim, duties[mevarchim_shabbat.pk])
+        self.assertIn(hag, duties[hag_shabbat.pk])
+        self.assertFalse([duty for duty in duties[regular.pk] if duty.not_applicable_for_roster])
+
+
+class ShabbatCalendarFieldsTestCase(TransactionTestCase):
+    fixtures = ['duties', 'torahParasha']
+
+    def test_calendar_fields(self):
+        Shabbat.objects.seed(5778)
+        adar = Shabbat.objects.filter(hebrew_year=5778, hebrew_month=12).order_by('dayt')
+        self.assertEqual([shabbat.dayt for shabbat in adar], [datetime.date(2018, 2, 17), datetime.date(2018, 2, 24), datetime.date(2018, 3, 3), datetime.date(2018, 3, 10)])
+        self.assertEqual(list(Shabbat.objects.filter(hebrew_year=5778, dayt__week_day=7).exclude(holiday='').order_by('dayt').values_list('holiday', flat=True)),
+                         ['Yom Kippur', 'Sukkot', 'Pesach'])                            # On Shabbat
+        self.assertEqual(Shabbat.objects.filter(hebrew_year=5778, is_zachor=True).get().dayt, datetime.date(2018, 2, 24))
+
+        shabbat = Shabbat.objects.get(dayt=datetime.date(2018, 3, 10))
+        self.assertEqual((shabbat.hebrew_year, shabbat.hebrew_month, shabbat.hebrew_day), (5778, 12, 23))
+        self.assertEqual(shabbat.julian_day, 2458187)
+        self.assertTrue(shabbat.is_mevarchim and shabbat.is_parah)
+        self.assertFalse(shabbat.is_hag)
+
+        shabbat.dayt = datetime.date(2018, 3, 31)                                      # Kept in sync on save
+        Shabbat.objects.filter(dayt=shabbat.dayt).delete()
+        shabbat.save()
+        shabbat.refresh_from_db()
+        self.assertEqual((shabbat.hebrew_month, shabbat.hebrew_day, shabbat.holiday, shabbat.is_hag, shabbat.is_mevarchim), (1, 15, 'Pesach', True, False))
+
+        Shabbat.objects.update(hebrew_year=None, is_hag=False)                          # Backfill
+        self.assertEqual(Shabbat.objects.update_calendar_fields(), Shabbat.objects.count())
+        self.assertEqual(Shabbat.objects.filter(hebrew_year=5778, dayt__week_day=7, is_hag=True).count(), 2)         # Yom Kippur, Pesach
+        self.assertEqual(Shabbat.objects.update_calendar_fields(), 0)
+
+
+class PriorityCandidatesTestCase(TransactionTestCase):
+    fixtures = ['duties', 'torahParasha']
+
+    def setUp(self):
+        User.objects.create_superuser(username='abc', password='test', email='admin@mail.com', first_name='ad', last_name='min')
+        self.mishpatim = Shabbat.objects.create(dayt=datetime.date(2025, 2, 22), parasha=Parasha.objects.get(name='משפטים'))
+        self.regular = Shabbat.objects.create(dayt=datetime.date(2025, 3, 1), parasha=Parasha.objects.get(name='תרומה'))
+        self.father = Profile.objects.create(full_name='father', dod_month=Profile.MONTH_ADAR1, dod_day=30)        # 30 Shvat 5785 = 28/2/2025
+        self.son = Profile.objects.create(first_name='son', last_name='s')
+        self.bar_mitzvah = Profile.objects.create(first_name='bar', last_name='mitzvah', bar_mitzvah_parasha=self.mishpatim.parasha)
+        family = Family.objects.create()
+        family.parents.add(self.father)
+        family.children.add(self.son)
+
+    def test_priority_candidates(self):
+        priority_candidates(Shabbat.objects.all())                                  # Fill the indexes
+        shabbatot = list(Shabbat.objects.all())
+        with self.assertNumQueries(1):
+            candidates = priority_candidates(shabbatot)
+        self.assertEqual(candidates[self.regular.pk], [])
+        self.assertEqual(candidates[self.mishpatim.pk], [
+            {'profile': self.son.pk, 'name': 'son', 'reason': PRIORITY_YAHRZEIT, 'deceased': self.father.pk, 'deceased_name': 'father'},
+            {'profile': self.bar_mitzvah.pk, 'name': 'bar', 'reason': PRIORITY_BAR_MITZVAH},
+        ])
+
+        self.son.family_of_children.get().children.remove(self.son)                # Signals drop the indexes
+        self.assertEqual([candidate['reason'] for candidate in priority_candidates([self.mishpatim])[self.mishpatim.pk]], [PRIORITY_BAR_MITZVAH])
+
+    def test_api(self):
+        admin = APIClient()
+        self.assertEqual(admin.login(username='ad_min', password='test'), True)
+        response = admin.get(reverse('shabbat-list'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([len(shabbat['priority_candidates']) for shabbat in response.data], [2, 0])
+        response = admin.get(reverse('shabbat-detail', args=[self.mishpatim.pk]), format='json')
+        self.assertEqual(response.data['priority_candidates'][0]['profile'], self.son.pk)
+
+
+class AliyahAllocationTestCase(TransactionTestCase):
+    fixtures = ['duties', 'torahParasha', 'torahSegment']
+
+    def test_allocate_aliyot(self):
+        Shabbat.objects.seed(5785)
+        shabbatot = Shabbat.objects.filter(dayt__in=[datetime.date(2024, 10, 26), datetime.date(2024, 11, 2)])      # בראשית, נח (both have segments)
+        for i in range(2):
+            Profile.objects.create(full_name='cohen %s' % i, title=Profile.PROFILE_TITLE_COHEN, bar_mitzvahed=True)
+        levi = Profile.objects.create(full_name='levi', title=Profile.PROFILE_TITLE_LEVI, bar_mitzvahed=True)
+        for i in range(10):
+            Profile.objects.create(full_name='yisrael %s' % i, title=Profile.PROFILE_TITLE_YISRAEL, bar_mitzvahed=True)
+        Profile.objects.create(full_name='woman', gender=Profile.PROFILE_GENDER_FEMALE, bar_mitzvahed=True)
+
+        created = allocate_aliyot(shabbatot)
+        self.assertEqual(created, Assignment.objects.count())
+        self.assertEqual(set(Assignment.objects.values_list('status', 'offer_type')), {(Assignment.STATUS_OFFERED, Assignment.OFFER_TYPE_REGULAR)})
+        for shabbat in shabbatot:
+            assignments = Assignment.objects.filter(roster__shabbat=shabbat)
+            self.assertEqual(assignments.filter(roster__duty__name='ראשון').get().profile.title, Profile.PROFILE_TITLE_COHEN)
+            self.assertEqual(assignments.filter(roster__duty__name='שני').get().profile, levi)
+            self.assertEqual(set(assignments.filter(roster__duty__name='שלישי').values_list('profile__title', flat=True)), {Profile.PROFILE_TITLE_YISRAEL})
+            self.assertFalse(assignments.filter(profile__gender=Profile.PROFILE_GENDER_FEMALE).exists())
+            self.assertEqual(assignments.values('profile').distinct().count(), assignments.count())     # One aliyah per profile
+        yisraelim = [set(Assignment.objects.filter(roster__shabbat=shabbat).exclude(roster__duty__name__in=['ראשון', 'שני', 'הפטרה']).values_list('profile', flat=True))
+                     for shabbat in shabbatot]
+        self.assertEqual([len(profiles) for profiles in yisraelim], [5, 5])             # שלישי to שביעי
+        self.assertFalse(yisraelim[0] & yisraelim[1])                                   # Rotation
+
+        self.assertEqual(allocate_aliyot(shabbatot), 0)                                 # Allocated rosters are kept
+
+    def test_priority_aliyot(self):
+        Shabbat.objects.seed(5785)
+        shabbat = Shabbat.objects.filter(dayt=datetime.date(2024, 10, 26))                                         # בראשית, 24 Tishrei 5785
+        Profile.objects.create(full_name='cohen', title=Profile.PROFILE_TITLE_COHEN, bar_mitzvahed=True)
+        Profile.objects.create(full_name='levi', title=Profile.PROFILE_TITLE_LEVI, bar_mitzvahed=True)
+        for i in range(10):
+            Profile.objects.create(full_name='yisrael %s' % i, title=Profile.PROFILE_TITLE_YISRAEL, bar_mitzvahed=True)
+        bar_mitzvah = Profile.objects.create(full_name='bar mitzvah', bar_mitzvah_parasha=shabbat.get().parasha)
+        girl = Profile.objects.create(full_name='bat mitzvah', gender=Profile.PROFILE_GENDER_FEMALE, bar_mitzvah_parasha=shabbat.get().parasha)
+        father = Profile.objects.create(full_name='father', dod_month=Profile.MONTH_TISHREI, dod_day=25)           # 27/10/2024
+        mourner = Profile.objects.create(full_name='mourner', title=Profile.PROFILE_TITLE_LEVI, bar_mitzvahed=True)
+        daughter = Profile.objects.create(full_name='daughter', gender=Profile.PROFILE_GENDER_FEMALE, bar_mitzvahed=True)
+        minor = Profile.objects.create(full_name='minor')
+        family = Family.objects.create()
+        family.parents.add(father)
+        family.children.add(mourner, daughter, minor)
+
+        allocate_aliyot(shabbat)
+        special = Assignment.objects.filter(offer_type=Assignment.OFFER_TYPE_SPECIAL)
+        self.assertEqual(dict(special.values_list('roster__duty__name', 'profile')), {'הפטרה': bar_mitzvah.pk, 'שני': mourner.pk})     # The haftorah first, then a segment the title allows
+        self.assertFalse(Assignment.objects.filter(profile__in=[girl, daughter, minor]).exists())
+
+
+class RosterRotationTestCase(TransactionTestCase):
+    fixtures = ['torahParasha']
+
+    def test_generate_rosters(self):
+        duty = Duty.objects.create(category='שונות', name='מגבה', order_id=500)
+        parasha = Parasha.objects.get(name='בראשית')
+        shabbatot = [Shabbat.objects.create(dayt=datetime.date(2017, 10, 14) + datetime.timedelta(7 * i), parasha=parasha) for i in range(4)]
+        rosters = [Roster.objects.create(shabbat=shabbat, duty=duty) for shabbat in shabbatot]
+        profiles = [Profile.objects.create(full_name='profile %s' % i, bar_mitzvahed=True) for i in range(3)]
+        child = Profile.objects.create(full_name='child')
+        for profile in profiles + [child]:
+            profile.duties.add(duty)
+
+        Assignment.objects.create(roster=rosters[0], profile=profiles[0], status=Assignment.STATUS_CONFIRMED)
+        Assignment.objects.create(roster=rosters[0], profile=profiles[1], status=Assignment.STATUS_CONFIRMED, offer_type=Assignment.OFFER_TYPE_SPECIAL)     # Not a turn
+        Assignment.objects.create(roster=rosters[1], profile=profiles[1], status=Assignment.STATUS_POSTPONED)
+
+        self.assertEqual(generate_rosters(shabbatot[1].dayt, shabbatot[3].dayt, [duty]), 3)
+        offered = Assignment.objects.filter(status=Assignment.STATUS_OFFERED).order_by('roster__shabbat__dayt')
+        self.assertEqual([assignment.profile for assignment in offered], [profiles[2], profiles[1], profiles[0]])
+        self.assertEqual(TurnStats.objects.get(profile=profiles[0], duty=duty).turns, 2)
+        self.assertEqual(generate_rosters(shabbatot[1].dayt, shabbatot[3].dayt, [duty]), 0)
+
+
+class TurnStatsTestCase(TransactionTestCase):
+    fixtures = ['torahParasha']
+
+    def test_turn_stats(self):
+        duty = Duty.objects.create(category='שונות', name='מגבה', order_id=500)
+        parasha = Parasha.objects.get(name='בראשית')
+        rosters = [Roster.objects.create(shabbat=Shabbat.objects.create(dayt=dayt, parasha=parasha), duty=duty)
+                   for dayt in (datetime.date(2017, 10, 14), datetime.date(2017, 10, 21), datetime.date(2018, 10, 6))]       # 5778, 5778, 5779
+        profile = Profile.objects.create(full_name='profile', bar_mitzvahed=True)
+
+        first = Assignment.objects.create(roster=rosters[0], profile=profile, status=Assignment.STATUS_CONFIRMED)
+        second = Assignment.objects.create(roster=rosters[1], profile=profile, offer_type=Assignment.OFFER_TYPE_STANDIN)
+        Assignment.objects.create(roster=rosters[2], profile=profile)
+        stats = TurnStats.objects.get(profile=profile, duty=duty, hebrew_year=5778)
+        self.assertEqual((stats.turns, stats.confirmed, stats.offered, stats.regular, stats.standin, stats.last_served), (1, 1, 1, 1, 1, datetime.date(2017, 10, 14)))
+        self.assertEqual(TurnStats.objects.get(profile=profile, hebrew_year=5779).turns, 1)
+
+        second.offer_type = Assignment.OFFER_TYPE_REGULAR                           # Updated on save
+        second.save()
+        self.assertEqual(TurnStats.objects.get(profile=profile, hebrew_year=5778).last_served, datetime.date(2017, 10, 21))
+        second.delete()                                                             # and on delete
+        first.delete()
+        self.assertFalse(TurnStats.objects.filter(hebrew_year=5778).exists())
+
+        TurnStats.objects.all().delete()
+        self.assertEqual(TurnStats.objects.rebuild(), 1)
+        self.assertEqual(TurnStats.objects.get().hebrew_year, 5779)
+
+
+class EligibilityTestCase(TransactionTestCase):
+    fixtures = ['torahParasha']
+
+    def setUp(self):
+        User.objects.create_superuser(username='abc', password='test', email='admin@mail.com', first_name='ad', last_name='min')
+        self.duty = Duty.objects.create(category='שונות', name='מגבה', order_id=500)
+        self.rishon = Duty.objects.create(category='עליות', name='ראשון', order_id=501)
+        self.sheni = Duty.objects.create(category='עליות', name='שני', order_id=502)
+        self.shabbat = Shabbat.objects.create(dayt=datetime.date(2017, 10, 14), parasha=Parasha.objects.get(name='בראשית'))
+        self.cohen = Profile.objects.create(full_name='cohen', title=Profile.PROFILE_TITLE_COHEN, bar_mitzvahed=True)
+        self.yisrael = Profile.objects.create(full_name='yisrael', bar_mitzvahed=True)
+        self.child = Profile.objects.create(full_name='child')
+        for profile in (self.cohen, self.yisrael, self.child):
+            profile.duties.add(self.duty)
+
+    def test_matrix(self):
+        eligibility_matrix.matrix()
+        with self.assertNumQueries(0):
+            self.assertEqual(eligibility_matrix.eligible(self.duty.pk), [self.cohen.pk, self.yisrael.pk])
+            self.assertEqual(eligibility_matrix.eligible(self.rishon.pk), [self.cohen.pk])
+            self.assertEqual(eligibility_matrix.eligible(self.sheni.pk), [self.cohen.pk, self.yisrael.pk])     # No Levi: the fallback titles
+            self.assertTrue(eligibility_matrix.is_eligible(self.duty.pk, self.yisrael.pk))
+            self.assertFalse(eligibility_matrix.is_eligible(self.duty.pk, self.child.pk))
+            self.assertEqual(eligibility_matrix.aliyah_title(self.child.pk), Profile.PROFILE_TITLE_YISRAEL)         # For a bar-mitzvah
+
+        self.duty.applicable_for_children = True                                    # Signals drop the matrix
+        self.duty.save()
+        self.assertTrue(eligibility_matrix.is_eligible(self.duty.pk, self.child.pk))
+        self.yisrael.duties.remove(self.duty)
+        self.assertFalse(eligibility_matrix.is_eligible(self.duty.pk, self.yisrael.pk))
+
+    def test_max_age(self):
+        matrix = EligibilityMatrix(max_age=0)
+        self.assertTrue(matrix.is_eligible(self.duty.pk, self.yisrael.pk))
+        Profile.duties.through.objects.filter(profile=self.yisrael).delete()       # Sends no signal, like a change made by another process
+        self.assertFalse(matrix.is_eligible(self.duty.pk, self.yisrael.pk))
+
+    def test_roster_candidates(self):
+        roster = Roster.objects.create(shabbat=self.shabbat, duty=self.duty)
+        earlier = Roster.objects.create(shabbat=Shabbat.objects.create(dayt=datetime.date(2017, 10, 7), parasha=self.shabbat.parasha), duty=self.duty)
+        Assignment.objects.create(roster=earlier, profile=self.cohen, status=Assignment.STATUS_CONFIRMED)
+
+        admin = APIClient()
+        self.assertEqual(admin.login(username='ad_min', password='test'), True)
+        response = admin.get(reverse('roster-candidates', args=[roster.pk]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(candidate['profile'], candidate['turns']) for candidate in response.data], [(self.yisrael.pk, 0), (self.cohen.pk, 1)])   # Never served first
+        self.assertEqual(response.data[0]['name'], 'yisrael')
+
+        Assignment.objects.create(roster=roster, profile=self.yisrael)
+        response = admin.get(reverse('roster-candidates', args=[roster.pk]), format='json')
+        self.assertEqual([candidate['profile'] for candidate in response.data], [self.cohen.pk])
+
+    def test_standins(self):
+        roster = Roster.objects.create(shabbat=self.shabbat, duty=self.duty)
+        other = Roster.objects.create(shabbat=self.shabbat, duty=Duty.objects.create(category='שונות', name='פותח', order_id=503))
+        earlier = Roster.objects.create(shabbat=Shabbat.objects.create(dayt=datetime.date(2017, 10, 21), parasha=self.shabbat.parasha), duty=self.duty)
+        Assignment.objects.create(roster=earlier, profile=self.cohen, status=Assignment.STATUS_CONFIRMED)
+        Assignment.objects.create(roster=roster, profile=self.yisrael, status=Assignment.STATUS_CANCELLED)
+        cantor = Profile.objects.create(full_name='cantor', bar_mitzvahed=True)
+        cantor.duties.add(self.duty)
+
+        admin = APIClient()
+        self.assertEqual(admin.login(username='ad_min', password='test'), True)
+        response = admin.get(reverse('roster-assignment-standins', args=[roster.pk]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(candidate['profile'], candidate['turns']) for candidate in response.data], [(cantor.pk, 0), (self.cohen.pk, 1)])
+        response = admin.get(reverse('roster-assignment-standins', args=[roster.pk]), {'k': 1}, format='json')
+        self.assertEqual([candidate['profile'] for candidate in response.data], [cantor.pk])
+        response = admin.get(reverse('roster-assignment-standins', args=[roster.pk]), {'k': 0}, format='json')
+        self.assertEqual(len(response.data), 1)                                     # k is at least 1
+
+        Assignment.objects.create(roster=other, profile=cantor)                     # Already has a duty that Shabbat
+        response = admin.post(reverse('roster-assignment-standins', args=[roster.pk]), {'profile': cantor.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = admin.post(reverse('roster-assignment-standins', args=[roster.pk]), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        assignment = Assignment.objects.get(pk=response.data['id'])
+        self.assertEqual((assignment.profile, assignment.offer_type, assignment.status), (self.cohen, Assignment.OFFER_TYPE_STANDIN, Assignment.STATUS_OFFERED))
+
+
+class SeasonViewTestCase(TransactionTestCase):
+    fixtures = ['duties', 'torahParasha']
+
+    def setUp(self):
+        User.objects.create_superuser(username='abc', password='test', email='admin@mail.com', first_name='ad', last_name='min')
+        self.duties = list(Duty.objects.filter(not_applicable_for_roster=False)[:3])
+        self.profiles = [Profile.objects.create(full_name='profile %s' % i) for i in range(3)]
+        self.add_shabbatot(datetime.date(2024, 11, 2), 2)                            # 5785
+
+    def add_shabbatot(self, dayt, count):
+        for i in range(count):
+            shabbat = Shabbat.objects.create(dayt=dayt + datetime.timedelta(weeks=i), parasha=Parasha.objects.get(name='נח'))
+            for duty, profile in zip(self.duties, self.profiles):
+                Assignment.objects.create(roster=Roster.objects.create(shabbat=shabbat, duty=duty), profile=profile)
+
+    def test_serializer_queries(self):
+        request = APIRequestFactory().get('/')
+        priority_candidates(Shabbat.objects.all())                                  # Fill the indexes
+        with self.assertNumQueries(3):                                              # Shabbatot with their Parasha, Rosters with their Duty, Assignments
+            data = ShabbatSerializer(Shabbat.objects.with_rosters(), many=True, context={'request': request}).data
+        self.assertEqual([len(shabbat['roster']) for shabbat in data], [3, 3])
+        self.assertEqual(data[0]['roster'][0]['assignments'][0]['profile'], self.profiles[0].pk)
+
+    def test_season(self):
+        admin = APIClient()
+        self.assertEqual(admin.login(username='ad_min', password='test'), True)
+        admin.get(reverse('shabbat-season'), {'year': 5785}, format='json')          # Fill the indexes
+        with CaptureQueriesContext(connection) as queries:
+            response = admin.get(reverse('shabbat-season'), {'year': 5785}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+        self.add_shabbatot(datetime.date(2024, 11, 16), 3)
+        self.add_shabbatot(datetime.date(2025, 11, 1), 1)                            # 5786
+        with self.assertNumQueries(len(queries)):                                   # Does not grow with the season
+            response = admin.get(reverse('shabbat-season'), {'year': 5785}, format='json')
+        self.assertEqual(len(response.data), 5)
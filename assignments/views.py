@@ -1,9 +1,13 @@
+import datetime
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import Http404
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import detail_route, list_route
 from rest_framework.permissions import BasePermission
 from rest_framework.response import Response
 
+from .eligibility import STANDIN_CANDIDATES, roster_candidates, standin_candidates
+from .managers import calendar_fields
 from .models import Duty, Shabbat, Assignment, Roster
 from .serializers import ShabbatSerializer, AssignmentSerializer, DutySerializer, RosterSerializer, \
     RosterUpdateSerializer, AssignmentUpdateSerializer, ShabbatUpdateSerializer
@@ -39,10 +43,23 @@ class ShabbatViewSet(UpdateSerializerMixin, viewsets.ModelViewSet):
     """
     Manage Shabbatot
     """
-    queryset = Shabbat.objects.all().order_by('dayt')
+    queryset = Shabbat.objects.with_rosters().order_by('dayt')
     serializer_class = ShabbatSerializer
     update_serializer_class = ShabbatUpdateSerializer
 
+    @list_route()
+    def season(self, request):
+        """
+        Returns the Shabbatot of a Hebrew year (?year=, the current year by default) with their rosters and assignments,
+        in a fixed number of queries (see ShabbatQuerySet.with_rosters)
+        """
+        try:
+            year = int(request.query_params.get('year') or calendar_fields(datetime.date.today())['hebrew_year'])
+        except ValueError:
+            return Response({'year': 'Must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(self.get_queryset().filter(hebrew_year=year), many=True)
+        return Response(serializer.data)
+
 
 class AssignmentUpdatePermission(BasePermission):
     def has_permission(self, request, view):
@@ -128,6 +145,34 @@ class AssignmentViewSet(UpdateSerializerMixin, viewsets.ModelViewSet):
         request.data["roster"] = roster_pk
         return super(AssignmentViewSet, self).update(request)
 
+    @list_route(methods=['get', 'post'])
+    def standins(self, request, roster_pk=None):
+        """
+        get: Returns the top stand-in candidates for the roster (?k=, see eligibility.standin_candidates).
+        post: Assigns a stand-in ({"profile": pk}, or the top candidate if no profile is given) as an OFFERED STANDIN assignment.
+        """
+        try:
+            roster = Roster.objects.select_related('shabbat').get(pk=roster_pk)
+        except Roster.DoesNotExist:
+            raise Http404
+
+        if request.method == 'GET':
+            try:
+                k = int(request.query_params.get('k', STANDIN_CANDIDATES))
+            except ValueError:
+                return Response({'k': 'Must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(standin_candidates(roster, k))
+
+        profile = request.data.get('profile')
+        candidates = standin_candidates(roster, None if profile else 1)
+        if profile:
+            candidates = [candidate for candidate in candidates if str(candidate['profile']) == str(profile)]
+        if not candidates:
+            return Response({'profile': 'No eligible stand-in'}, status=status.HTTP_400_BAD_REQUEST)
+        assignment = Assignment.objects.create(roster=roster, profile_id=candidates[0]['profile'], status=Assignment.STATUS_OFFERED,
+                                               offer_type=Assignment.OFFER_TYPE_STANDIN)
+        return Response(self.serializer_class(assignment).data, status=status.HTTP_201_CREATED)
+
 
 class RosterViewSet(UpdateSerializerMixin, viewsets.ModelViewSet):
     """
@@ -136,3 +181,8 @@ class RosterViewSet(UpdateSerializerMixin, viewsets.ModelViewSet):
     queryset = Roster.objects.all() #.order_by('dayt')
     serializer_class = RosterSerializer
     update_serializer_class = RosterUpdateSerializer
+
+    @detail_route(methods=['get'])
+    def candidates(self, request, pk=None):
+        """Returns the profiles eligible for the roster, ranked by fairness (see eligibility.roster_candidates)"""
+        return Response(roster_candidates(self.get_object()))
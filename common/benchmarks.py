@@ -0,0 +1,246 @@
+#  benchmarks.py: Speed and memory benchmarks of the calendar and zmanim code.
+#
+# Every benchmark runs over all the days of a range of Gregorian years (1, 10 and 100 by default, starting at
+# START_YEAR) and reports ops/sec (an op is one day, or one year-table for the zmanim tables) and the peak
+# memory allocated while it runs. Caches are cleared before each run, so the numbers include filling them.
+#
+#   python -m common.benchmarks [--years 1 10 100] [--only jd_to_hebrew ...] [--output results.json]
+#                               [--compare baseline.json [--threshold 0.2]]
+#
+# With --compare, each result is compared with the same benchmark in a previous output file, and the exit
+# status is 1 if any of them is slower by more than the threshold.
+#
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+
+from common.date_utils import calendar_batch, calendar_util
+from common.jewish_dates import dates, holidays, locations, parasha, sun, sun_batch, sun_precise, zmanim
+from common.jewish_dates.hebrew_year import HebrewYear
+
+START_YEAR = 2000
+YEARS = (1, 10, 100)
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """Registers a benchmark function, taking (first_year, years) and returning the number of ops it ran"""
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def clear_caches():
+    HebrewYear._years.clear()
+    parasha.getTorahYear.cache_clear()
+    holidays.get_holiday_year.cache_clear()
+    dates.get_special_days.cache_clear()
+    locations.get_utc_offsets.cache_clear()
+    sun_precise.day_terms.cache_clear()
+    zmanim.get_zmanim_table.cache_clear()
+
+
+def _days(first_year, years):
+    first = datetime.date(first_year, 1, 1)
+    return [first + datetime.timedelta(day) for day in range(datetime.date(first_year + years, 1, 1).toordinal() - first.toordinal())]
+
+
+def _jds(first_year, years):
+    start = calendar_util.gregorian_to_jd(first_year, 1, 1)
+    return np.arange(start, calendar_util.gregorian_to_jd(first_year + years, 1, 1))
+
+
+@benchmark('gregorian_to_jd')
+def _gregorian_to_jd(first_year, years):
+    days = _days(first_year, years)
+    for day in days:
+        calendar_util.gregorian_to_jd(day.year, day.month, day.day)
+    return len(days)
+
+
+@benchmark('jd_to_hebrew_reference')
+def _jd_to_hebrew_reference(first_year, years):
+    jds = _jds(first_year, years).tolist()
+    for jd in jds:
+        calendar_util.jd_to_hebrew_reference(jd)
+    return len(jds)
+
+
+@benchmark('jd_to_hebrew')
+def _jd_to_hebrew(first_year, years):
+    jds = _jds(first_year, years).tolist()
+    for jd in jds:
+        calendar_util.jd_to_hebrew(jd)
+    return len(jds)
+
+
+@benchmark('batch_jd_to_hebrew')
+def _batch_jd_to_hebrew(first_year, years):
+    jds = _jds(first_year, years)
+    calendar_batch.jd_to_hebrew(jds)
+    return len(jds)
+
+
+@benchmark('batch_hebrew_to_jd')
+def _batch_hebrew_to_jd(first_year, years):
+    year, month, day = calendar_batch.jd_to_hebrew(_jds(first_year, years))
+    calendar_batch.hebrew_to_jd(year, month, day)
+    return len(year)
+
+
+@benchmark('getTorahSections')
+def _get_torah_sections(first_year, years):
+    jds = _jds(first_year, years).tolist()
+    for jd in jds:
+        year, month, day = calendar_util.jd_to_hebrew(jd)
+        parasha.getTorahSections(month, day, year, False)
+    return len(jds)
+
+
+@benchmark('get_hag_and_shabbat')
+def _get_hag_and_shabbat(first_year, years):
+    days = _days(first_year, years)
+    for day in days:
+        holidays.get_hag_and_shabbat(day)
+    return len(days)
+
+
+@benchmark('iter_calendar')
+def _iter_calendar(first_year, years):
+    for day in dates.iter_calendar(datetime.date(first_year, 1, 1), datetime.date(first_year + years - 1, 12, 31)):
+        pass
+    return len(_jds(first_year, years))
+
+
+@benchmark('sun.GetSunrise+GetSunset')
+def _sun(first_year, years):
+    location = locations.sun_location(locations.get_location(), datetime.date(first_year, 1, 1))
+    days = _days(first_year, years)
+    for day in days:
+        sun.GetSunrise(day.month, day.day, day.year, location)
+        sun.GetSunset(day.month, day.day, day.year, location)
+    return len(days)
+
+
+@benchmark('sun_batch.sunrise_sunset')
+def _sun_batch(first_year, years):
+    location = locations.sun_location(locations.get_location(), datetime.date(first_year, 1, 1))
+    year, month, day = calendar_batch.jd_to_gregorian(_jds(first_year, years))
+    sun_batch.sunrise_sunset(year, month, day, location)
+    return len(year)
+
+
+@benchmark('zmanim.compute_year')
+def _zmanim_low(first_year, years):
+    for year in range(first_year, first_year + years):
+        zmanim.compute_year(year, locations.get_location(), zmanim.PRECISION_LOW)
+    return years
+
+
+@benchmark('zmanim.compute_year(high)')
+def _zmanim_high(first_year, years):
+    for year in range(first_year, first_year + years):
+        zmanim.compute_year(year, locations.get_location(), zmanim.PRECISION_HIGH)
+    return years
+
+
+def run(name, years, first_year=START_YEAR):
+    """Runs a benchmark twice (timed, then under tracemalloc for the peak memory) and returns its result dict"""
+    function = BENCHMARKS[name]
+
+    clear_caches()
+    start = time.perf_counter()
+    ops = function(first_year, years)
+    seconds = time.perf_counter() - start
+
+    clear_caches()
+    tracemalloc.start()
+    try:
+        function(first_year, years)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return OrderedDict((
+        ('name', name),
+        ('years', years),
+        ('ops', ops),
+        ('seconds', seconds),
+        ('ops_per_sec', ops / seconds if seconds else float('inf')),
+        ('peak_memory', peak),
+    ))
+
+
+def run_all(years=YEARS, names=None, first_year=START_YEAR, out=None):
+    results = []
+    for name in names or BENCHMARKS:
+        for count in years:
+            result = run(name, count, first_year)
+            results.append(result)
+            if out:
+                out.write('%-28s %4d years %14.0f ops/sec %10.1f KiB peak\n' % (
+                    name, count, result['ops_per_sec'], result['peak_memory'] / 1024.0))
+    return OrderedDict((
+        ('meta', OrderedDict((
+            ('date', datetime.datetime.utcnow().isoformat()),
+            ('python', platform.python_version()),
+            ('numpy', np.__version__),
+            ('platform', platform.platform()),
+            ('first_year', first_year),
+        ))),
+        ('results', results),
+    ))
+
+
+def compare(results, baseline, threshold=0.2, out=None):
+    """
+    Compares ops/sec with a previous run (both as returned by run_all).
+    Returns the list of (name, years, ratio) slower than the baseline by more than threshold.
+    """
+    previous = dict(((result['name'], result['years']), result) for result in baseline['results'])
+    regressions = []
+    for result in results['results']:
+        key = (result['name'], result['years'])
+        if key not in previous:
+            continue
+        ratio = result['ops_per_sec'] / previous[key]['ops_per_sec']
+        if ratio < 1 - threshold:
+            regressions.append((result['name'], result['years'], ratio))
+        if out:
+            out.write('%-28s %4d years %8.2fx%s\n' % (result['name'], result['years'], ratio, '  REGRESSION' if ratio < 1 - threshold else ''))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks the calendar and zmanim code')
+    parser.add_argument('--years', type=int, nargs='+', default=list(YEARS), help='Lengths of the ranges to run (in years)')
+    parser.add_argument('--first-year', type=int, default=START_YEAR)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Benchmarks to run (all by default)')
+    parser.add_argument('--output', help='Saves the results as JSON')
+    parser.add_argument('--compare', help='A previous JSON output to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Slowdown (as a fraction) reported as a regression')
+    args = parser.parse_args(argv)
+
+    results = run_all(args.years, args.only, args.first_year, sys.stdout)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold, sys.stdout):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
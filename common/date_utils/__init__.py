@@ -1 +1 @@
-__all__ = ['astro', 'calendar_util']
+__all__ = ['astro', 'calendar_batch', 'calendar_util']
@@ -0,0 +1,172 @@
+#  calendar_batch.py: NumPy versions of the calendar_util conversions.
+#
+# Each function takes arrays (or anything numpy.asarray accepts) and returns arrays, with results identical to
+# calling the calendar_util function of the same name on every element. The arithmetic deliberately follows
+# calendar_util step by step (including its truncating floor()), so the two can be checked against each other.
+#
+import numpy as np
+
+from .calendar_util import GREGORIAN_EPOCH, HEBREW_EPOCH, J1970
+
+
+def _floor(x):
+    # calendar_util.floor is int(), which truncates toward zero
+    return np.trunc(x).astype(np.int64)
+
+
+def _ints(*args):
+    return [np.asarray(a, dtype=np.int64) for a in args]
+
+
+def leap_gregorian(year):
+    year = np.asarray(year, dtype=np.int64)
+    return (year % 4 == 0) & ~((year % 100 == 0) & (year % 400 != 0))
+
+
+def gregorian_to_jd(year, month, day):
+    year, month, day = _ints(year, month, day)
+    leap_adj = np.where(month <= 2, 0, np.where(leap_gregorian(year), -1, -2))
+
+    return ((GREGORIAN_EPOCH - 1) +
+            (365 * (year - 1)) +
+            _floor((year - 1) / 4) +
+            (-_floor((year - 1) / 100)) +
+            _floor((year - 1) / 400) +
+            _floor((((367 * month) - 362) / 12) +
+                   leap_adj +
+                   day))
+
+
+def jd_to_gregorian(jd):
+    jd = np.asarray(jd, dtype=np.float64)
+    wjd = _floor(jd - 0.5) + 0.5
+    depoch = wjd - GREGORIAN_EPOCH
+    quadricent = _floor(depoch / 146097)
+    dqc = np.mod(depoch, 146097)
+    cent = _floor(dqc / 36524)
+    dcent = np.mod(dqc, 36524)
+    quad = _floor(dcent / 1461)
+    dquad = np.mod(dcent, 1461)
+    yindex = _floor(dquad / 365)
+    year = (quadricent * 400) + (cent * 100) + (quad * 4) + yindex
+    year += ~((cent == 4) | (yindex == 4))
+
+    yearday = wjd - gregorian_to_jd(year, 1, 1)
+    leap_adj = np.where(wjd < gregorian_to_jd(year, 3, 1), 0, np.where(leap_gregorian(year), 1, 2))
+
+    month = _floor((((yearday + leap_adj) * 12) + 373) / 367)
+    day = _floor(wjd - gregorian_to_jd(year, month, 1)) + 1
+    return (year, month, day)
+
+
+def hebrew_leap(year):
+    year = np.asarray(year, dtype=np.int64)
+    return np.mod(((year * 7) + 1), 19) < 7
+
+
+def hebrew_year_months(year):
+    return np.where(hebrew_leap(year), 13, 12)
+
+
+def hebrew_delay_1(year):
+    year = np.asarray(year, dtype=np.int64)
+    months = _floor(((235 * year) - 234) / 19)
+    parts = 12084 + (13753 * months)
+    day = _floor((months * 29) + parts / 25920)
+    return day + (np.mod((3 * (day + 1)), 7) < 3)
+
+
+def hebrew_delay_2(year):
+    year = np.asarray(year, dtype=np.int64)
+    last = hebrew_delay_1(year - 1)
+    present = hebrew_delay_1(year)
+    next = hebrew_delay_1(year + 1)
+
+    return np.where(next - present == 356, 2, np.where(present - last == 382, 1, 0))
+
+
+def _new_year_delay(year):
+    # Days from HEBREW_EPOCH to Rosh Hashana (less 2), i.e. hebrew_to_jd(year, 7, 1) - HEBREW_EPOCH - 2
+    return hebrew_delay_1(year) + hebrew_delay_2(year)
+
+
+def hebrew_year_days(year):
+    year = np.asarray(year, dtype=np.int64)
+    return _new_year_delay(year + 1) - _new_year_delay(year)
+
+
+def _hebrew_month_days_table(year):
+    # Returns an (n, 14) array whose [i, month] entry is hebrew_month_days(year[i], month); column 0 is unused (0)
+    year = np.asarray(year, dtype=np.int64).ravel()
+    year_days = np.mod(hebrew_year_days(year), 10)
+    table = np.full((year.size, 14), 30, dtype=np.int64)
+    table[:, 0] = 0
+    table[:, [2, 4, 6, 10, 13]] = 29
+    table[:, 12] = np.where(hebrew_leap(year), 30, 29)
+    table[:, 8] = np.where(year_days == 5, 30, 29)
+    table[:, 9] = np.where(year_days == 3, 29, 30)
+    return table
+
+
+def hebrew_month_days(year, month):
+    year, month = np.broadcast_arrays(*_ints(year, month))
+    table = _hebrew_month_days_table(year)
+    return table[np.arange(table.shape[0]), month.ravel()].reshape(month.shape)
+
+
+def hebrew_to_jd(year, month, day):
+    year, month, day = np.broadcast_arrays(*_ints(year, month, day))
+    shape = year.shape
+    year, month, day = year.ravel(), month.ravel(), day.ravel()
+    rows = np.arange(year.size)
+
+    # elapsed[i, m] is the number of days in months 1..m of year[i]
+    elapsed = np.cumsum(_hebrew_month_days_table(year), axis=1)
+    from_tishrei = elapsed[rows, month - 1] - elapsed[:, 6]
+    to_year_end = elapsed[rows, hebrew_year_months(year)] - elapsed[:, 6]
+    months_before = np.where(month < 7, to_year_end + elapsed[rows, month - 1], from_tishrei)
+
+    jd = HEBREW_EPOCH + hebrew_delay_1(year) + hebrew_delay_2(year) + day + 1 + months_before
+    return jd.reshape(shape)
+
+
+_TISHREI_ORDER_LEAP = np.array([7, 8, 9, 10, 11, 12, 13, 1, 2, 3, 4, 5, 6])
+_TISHREI_ORDER_COMMON = np.array([7, 8, 9, 10, 11, 12, 1, 2, 3, 4, 5, 6, 0])
+
+
+def jd_to_hebrew(jd):
+    jd = np.asarray(jd, dtype=np.float64)
+    shape = jd.shape
+    jd = _floor(jd.ravel()) + 0.5
+    count = _floor(((jd - HEBREW_EPOCH) * 98496.0) / 35975351.0)
+
+    # Same search as calendar_util: step forward while jd is on or after the next Rosh Hashana
+    year = count - 1
+    pending = np.ones(jd.shape, dtype=bool)
+    while pending.any():
+        pending[pending] = jd[pending] >= HEBREW_EPOCH + _new_year_delay(year[pending] + 1) + 2
+        year += pending
+
+    # Month starts are computed once per distinct year, in calendar order from Tishrei
+    years, index = np.unique(year, return_inverse=True)
+    order = np.where(hebrew_leap(years)[:, None], _TISHREI_ORDER_LEAP, _TISHREI_ORDER_COMMON)
+    lengths = np.take_along_axis(_hebrew_month_days_table(years), order, axis=1)
+    lengths[order == 0] = 0
+    starts = (HEBREW_EPOCH + _new_year_delay(years) + 2)[:, None] + np.cumsum(lengths, axis=1) - lengths
+    starts[order == 0] = np.inf
+
+    position = (starts[index] <= jd[:, None]).sum(axis=1) - 1
+    month = order[index, position]
+    day = _floor(jd - starts[index, position]) + 1
+    return (year.reshape(shape), month.reshape(shape), day.reshape(shape))
+
+
+def datetime64_to_jd(dates):
+    # Julian day (at midnight) of an array of numpy.datetime64 dates
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+    return days + J1970
+
+
+def jd_to_datetime64(jd):
+    jd = np.asarray(jd, dtype=np.float64)
+    return (_floor(jd - 0.5) + 0.5 - J1970).astype(np.int64).astype('datetime64[D]')
@@ -11,6 +11,9 @@
 # Meeus, Jean. Astronomical Algorithms . Richmond: Willmann-Bell, 1991. ISBN 0-943396-35-2. 
 #    The essential reference for computational positional astronomy. 
 #
+from array import array
+from bisect import bisect_right
+
 from .astro import *
 
 J0000 = 1721424.5  # // Julian date of Gregorian epoch: 0000-01-01
@@ -185,7 +188,9 @@ def hebrew_to_jd(year, month, day):
     return jd
 
 
-def jd_to_hebrew(jd):
+def jd_to_hebrew_reference(jd):
+    # //  Reference conversion: searches for the year and month with hebrew_to_jd.
+    # //  jd_to_hebrew gives the same result using the year table below.
     jd = floor(jd) + 0.5;
     count = floor(((jd - HEBREW_EPOCH) * 98496.0) / 35975351.0)
     year = count - 1;
@@ -208,6 +213,68 @@ def jd_to_hebrew(jd):
     return (year, month, day)
 
 
+# Range of Hebrew years covered by the jd_to_hebrew table (5600 = 1839/40, 6100 = 2339/40).
+# Dates outside the range fall back to jd_to_hebrew_reference.
+HEBREW_TABLE_FIRST_YEAR = 5600
+HEBREW_TABLE_LAST_YEAR = 6100
+
+_hebrew_table = None
+
+
+def set_hebrew_table_range(first_year, last_year):
+    # //  Changes the years covered by the jd_to_hebrew table (rebuilt on next use)
+    global HEBREW_TABLE_FIRST_YEAR, HEBREW_TABLE_LAST_YEAR, _hebrew_table
+    HEBREW_TABLE_FIRST_YEAR = first_year
+    HEBREW_TABLE_LAST_YEAR = last_year
+    _hebrew_table = None
+
+
+def _build_hebrew_table(first_year, last_year):
+    # //  Returns (first_year, year_starts, month_starts):
+    # //  year_starts[i] is the JD of Rosh Hashana of first_year + i (one extra entry ends the last year),
+    # //  month_starts maps a year length to the (day offsets, months) of its months, in order from Tishrei.
+    #     The month lengths only depend on the length of the year, so there are just six of these.
+    year_starts = array('d', (hebrew_to_jd(year, 7, 1) for year in range(first_year, last_year + 2)))
+    month_starts = {}
+    for i in range(last_year - first_year + 1):
+        year_days = int(year_starts[i + 1] - year_starts[i])
+        if year_days not in month_starts:
+            year = first_year + i
+            months = tuple(range(7, hebrew_year_months(year) + 1)) + tuple(range(1, 7))
+            offsets = []
+            offset = 0
+            for month in months:
+                offsets.append(offset)
+                offset += hebrew_month_days(year, month)
+            month_starts[year_days] = (tuple(offsets), months)
+    return (first_year, year_starts, month_starts)
+
+
+def jd_to_hebrew(jd):
+    global _hebrew_table
+    table = _hebrew_table
+    if table is None:
+        table = _hebrew_table = _build_hebrew_table(HEBREW_TABLE_FIRST_YEAR, HEBREW_TABLE_LAST_YEAR)
+    first_year, year_starts, month_starts = table
+
+    jd = floor(jd) + 0.5
+    last = len(year_starts) - 1
+    if not (year_starts[0] <= jd < year_starts[last]):
+        return jd_to_hebrew_reference(jd)
+
+    # //  Estimate the year from the mean year length, then correct by at most a year either way
+    i = min(int((jd - year_starts[0]) / 365.2468), last - 1)
+    while jd < year_starts[i]:
+        i -= 1
+    while jd >= year_starts[i + 1]:
+        i += 1
+
+    offset = int(jd - year_starts[i])
+    offsets, months = month_starts[int(year_starts[i + 1] - year_starts[i])]
+    m = bisect_right(offsets, offset) - 1
+    return (first_year + i, months[m], offset - offsets[m] + 1)
+
+
 def weekday_before(weekday, jd):
     return jd - jwday(jd - weekday);
 
@@ -1 +1 @@
-__all__ = ['dates', 'parasha', 'sun']
+__all__ = ['dates', 'hebrew_year', 'locations', 'parasha', 'sun', 'sun_batch', 'sun_precise', 'zmanim']
@@ -0,0 +1,144 @@
+import datetime
+import functools
+from collections import namedtuple
+from common.date_utils import calendar_util
+from common.jewish_dates import holidays
+from common.jewish_dates import parasha
+from common.jewish_dates.hebrew_year import HebrewYear, weekday
+from common.jewish_dates.holidays import YOM_TOV, get_hag_jd, get_holiday_year
+from common.jewish_dates.parasha import getTorahYear
+
+# A Shabbat or holiday:
+#   date        - datetime.date
+#   hebrew_date - (hebYear, hebMonth, hebDay)
+#   parasha_ids - the parasha.ID_* sections read (empty if it is not a Shabbat)
+#   holiday     - holiday name ('' if none)
+#   diaspora    - whether the parasha/holiday schedule is the diaspora's
+CalendarDay = namedtuple('CalendarDay', ('date', 'hebrew_date', 'parasha_ids', 'holiday', 'diaspora'))
+
+
+def _jd_to_date(jd):
+    return datetime.date(*calendar_util.jd_to_gregorian(jd))
+
+
+def _iter_hebrew_year(hebYear, diaspora):
+    """Yields (jd, parasha_ids, shabbat) for the Shabbatot and holidays (yamim tovim) of a Hebrew year, in date order"""
+    torah_year = getTorahYear(hebYear, diaspora)
+    shabbatot = sorted(torah_year.dates.values())
+    hagim = sorted(jd for jd, holidays in get_holiday_year(hebYear, diaspora).items()
+                   if any(holiday.kind == YOM_TOV for holiday in holidays))
+
+    i = 0
+    for week in shabbatot:
+        jd = torah_year.firstShabbat + 7 * week
+        while i < len(hagim) and hagim[i] < jd:
+            yield hagim[i], (), False
+            i += 1
+        if i < len(hagim) and hagim[i] == jd:        # Holiday on Shabbat
+            i += 1
+        yield jd, torah_year.sections[week], True
+    for jd in hagim[i:]:
+        yield jd, (), False
+
+
+def iter_calendar_jd(start_jd, end_jd, diaspora=False):
+    """
+    Yields a CalendarDay for every Shabbat and holiday from start_jd to end_jd (inclusive).
+    Works a Hebrew year at a time, so long ranges are streamed without building them in memory.
+    """
+    hebYear = calendar_util.jd_to_hebrew(start_jd)[0]
+    while HebrewYear(hebYear).rosh_hashana <= end_jd:
+        for jd, parasha_ids, shabbat in _iter_hebrew_year(hebYear, diaspora):
+            if jd < start_jd:
+                continue
+            if jd > end_jd:
+                return
+            yield CalendarDay(_jd_to_date(jd), calendar_util.jd_to_hebrew(jd), parasha_ids, get_hag_jd(jd, shabbat, diaspora), bool(diaspora))
+        hebYear += 1
+
+
+def iter_calendar(start, end, diaspora=False):
+    """Yields a CalendarDay for every Shabbat and holiday between two datetime.date (inclusive)"""
+    return iter_calendar_jd(calendar_util.gregorian_to_jd(start.year, start.month, start.day),
+                            calendar_util.gregorian_to_jd(end.year, end.month, end.day), diaspora)
+
+
+def iter_hebrew_calendar(start, end, diaspora=False):
+    """Yields a CalendarDay for every Shabbat and holiday between two (hebYear, hebMonth, hebDay) dates (inclusive)"""
+    return iter_calendar_jd(HebrewYear(start[0]).jd(start[1], start[2]), HebrewYear(end[0]).jd(end[1], end[2]), diaspora)
+
+
+def iter_hebrew_years(hebYear, years=1, diaspora=False):
+    """Yields a CalendarDay for every Shabbat and holiday of a number of Hebrew years, starting with hebYear"""
+    return iter_calendar_jd(HebrewYear(hebYear).rosh_hashana, HebrewYear(hebYear + years).rosh_hashana - 1, diaspora)
+
+
+# Special Shabbat tags
+MEVARCHIM = 'mevarchim'             # The Shabbat before Rosh Chodesh (other than Tishrei's)
+ROSH_CHODESH = 'roshchodesh'
+HAG = 'hag'
+CHOL_HAMOED = 'cholhamoed'
+SHEKALIM = 'shekalim'
+ZACHOR = 'zachor'
+PARAH = 'parah'
+HACHODESH = 'hachodesh'
+
+_HOLIDAY_TAGS = {
+    holidays.YOM_TOV: HAG,
+    holidays.CHOL_HAMOED: CHOL_HAMOED,
+    holidays.ROSH_CHODESH_DAY: ROSH_CHODESH,
+}
+
+_SECTION_TAGS = {
+    parasha.ID_SHEKALIM: SHEKALIM,
+    parasha.ID_ZAHOR: ZACHOR,
+    parasha.ID_PARAH: PARAH,
+    parasha.ID_HAHODESH: HACHODESH,
+}
+
+SPECIAL_YEAR_CACHE_SIZE = 32
+
+
+def _mevarchim(year):
+    # Julian dates of the Shabbatot Mevarchim of a Hebrew year: the last Shabbat before each Rosh Chodesh starts
+    months = year.month_order
+    for previous, month in zip(months, months[1:]):
+        jd = year.jd(month, 1) - (1 if year.month_days(previous) == 30 else 0) - 1
+        yield jd - (weekday(jd) + 1) % 7
+
+
+@functools.lru_cache(maxsize=SPECIAL_YEAR_CACHE_SIZE)
+def get_special_days(hebYear, diaspora=False):
+    """
+    Returns the special-Shabbat tags of a Hebrew year as a dict of {julian date: frozenset of tags}.
+    Holiday tags (HAG, CHOL_HAMOED, ROSH_CHODESH) are given for every day, the others only for Shabbatot.
+    Days without tags are left out.
+    """
+    days = {}
+    for jd, day_holidays in get_holiday_year(hebYear, diaspora).items():
+        tags = set(_HOLIDAY_TAGS[holiday.kind] for holiday in day_holidays if holiday.kind in _HOLIDAY_TAGS)
+        if tags:
+            days[jd] = tags
+    for jd in _mevarchim(HebrewYear(hebYear)):
+        days.setdefault(jd, set()).add(MEVARCHIM)
+    torah_year = getTorahYear(hebYear, diaspora)
+    for week, sections in enumerate(torah_year.sections):
+        tags = [_SECTION_TAGS[section] for section in sections if section in _SECTION_TAGS]
+        if tags:
+            days.setdefault(torah_year.firstShabbat + 7 * week, set()).update(tags)
+    return {jd: frozenset(tags) for jd, tags in days.items()}
+
+
+def get_special_tags_jd(jd, diaspora=False):
+    jd = int(jd) + 0.5
+    return get_special_days(calendar_util.jd_to_hebrew(jd)[0], diaspora).get(jd, frozenset())
+
+
+def get_special_tags(date, diaspora=False):
+    """Returns the special-Shabbat tags of a datetime.date (an empty frozenset for a regular Shabbat)"""
+    return get_special_tags_jd(calendar_util.gregorian_to_jd(date.year, date.month, date.day), diaspora)
+
+
+def classify_dates(dates, diaspora=False):
+    """Returns {date: frozenset of tags} for many datetime.date at once (each Hebrew year is computed once)"""
+    return {date: get_special_tags(date, diaspora) for date in dates}
@@ -0,0 +1,127 @@
+from common.date_utils import calendar_util
+
+# Year types (1-14, as used by the parasha schedules) keyed by (Rosh Hashana weekday, year length, Pesach weekday)
+YEAR_TYPES = {
+    (1, 353, 2): 1,
+    (6, 353, 0): 2,
+    (2, 354, 4): 3,
+    (4, 354, 6): 4,
+    (1, 355, 4): 5,
+    (4, 355, 0): 6,
+    (6, 355, 2): 7,
+    (1, 383, 4): 8,
+    (4, 383, 0): 9,
+    (6, 383, 2): 10,
+    (2, 384, 6): 11,
+    (1, 385, 6): 12,
+    (4, 385, 2): 13,
+    (6, 385, 4): 14,
+}
+
+
+def weekday(jd):
+    # Returns the weekday of a julian date (0 for Sunday, 1 for Monday,...)
+    return (int(jd) + 2) % 7
+
+
+class HebrewYear(object):
+    """
+    Calendar facts about a Hebrew year, each computed once on first use.
+    Instances are interned, so HebrewYear(5778) always returns the same object.
+    """
+    __slots__ = ('year', '_rosh_hashana', '_length', '_month_starts', '_year_type', '_bereshith')
+
+    _years = {}
+
+    def __new__(cls, year):
+        try:
+            return cls._years[year]
+        except KeyError:
+            pass
+        self = super().__new__(cls)
+        self.year = year
+        self._rosh_hashana = None
+        self._length = None
+        self._month_starts = None
+        self._year_type = None
+        self._bereshith = None
+        return cls._years.setdefault(year, self)
+
+    def __repr__(self):
+        return 'HebrewYear(%s)' % self.year
+
+    def __reduce__(self):
+        return (HebrewYear, (self.year,))
+
+    @property
+    def leap(self):
+        return calendar_util.hebrew_leap(self.year)
+
+    @property
+    def months(self):
+        """Number of months (12, or 13 in a leap year)"""
+        return 13 if self.leap else 12
+
+    @property
+    def month_order(self):
+        """Month numbers in calendar order, starting from Tishrei (7)"""
+        return tuple(range(7, self.months + 1)) + tuple(range(1, 7))
+
+    @property
+    def rosh_hashana(self):
+        """Julian date of 1 Tishrei"""
+        if self._rosh_hashana is None:
+            self._rosh_hashana = calendar_util.hebrew_to_jd(self.year, 7, 1)
+        return self._rosh_hashana
+
+    @property
+    def length(self):
+        """Number of days in the year"""
+        if self._length is None:
+            self._length = int(HebrewYear(self.year + 1).rosh_hashana - self.rosh_hashana)
+        return self._length
+
+    @property
+    def month_starts(self):
+        """Maps each month number to the julian date of its first day"""
+        if self._month_starts is None:
+            month_starts = {}
+            jd = self.rosh_hashana
+            for month in self.month_order:
+                month_starts[month] = jd
+                jd += calendar_util.hebrew_month_days(self.year, month)
+            self._month_starts = month_starts
+        return self._month_starts
+
+    def month_days(self, month):
+        if month == self.month_order[-1]:
+            return int(HebrewYear(self.year + 1).rosh_hashana - self.month_starts[month])
+        return int(self.month_starts[self.month_order[self.month_order.index(month) + 1]] - self.month_starts[month])
+
+    def jd(self, month, day):
+        """Julian date of a day in this year (same as calendar_util.hebrew_to_jd)"""
+        return self.month_starts[month] + day - 1
+
+    def weekday(self, month, day):
+        return weekday(self.jd(month, day))
+
+    @property
+    def pesach_weekday(self):
+        return self.weekday(1, 15)
+
+    @property
+    def year_type(self):
+        """The year type (1-14) selecting the parasha schedule, or 0 if the year is not valid"""
+        if self._year_type is None:
+            self._year_type = YEAR_TYPES.get((weekday(self.rosh_hashana), self.length, self.pesach_weekday), 0)
+        return self._year_type
+
+    @property
+    def bereshith(self):
+        """Julian date of Shabbat Bereshith (the first Shabbat after Simchat Torah)"""
+        if self._bereshith is None:
+            bereshith = self.jd(7, 23)
+            while weekday(bereshith) != 6:
+                bereshith += 1
+            self._bereshith = bereshith
+        return self._bereshith
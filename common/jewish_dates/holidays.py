@@ -1,49 +1,144 @@
 #http://www.david-greve.de/luach-code/jewish-python.html
 import datetime
-from common.date_utils_py2.calendar_util import gregorian_to_jd, jd_to_hebrew, hebrew_to_jd, leap_gregorian
-from common.jewish_dates.sun import GetSunrise, GetSunset, GetShaaZmanit, Dayhours, Nighthours
-import time
+import functools
+from collections import namedtuple
+from common.date_utils.calendar_util import gregorian_to_jd, jd_to_hebrew, leap_gregorian
+from common.jewish_dates.hebrew_year import HebrewYear, weekday
+from common.jewish_dates.sun import Dayhours, Nighthours
+from common.jewish_dates.locations import get_location
+from common.jewish_dates.zmanim import PRECISION_LOW, get_zmanim_table
 from datetime import datetime
 from common.jewish_dates.parasha import getTorahSections
 
-# Returns the weekday from a given hebrew date (0 for Sunday, 1 for Monday,...)
-def _getWeekdayOfHebrewDate(hebDay, hebMonth, hebYear):
-    # Calculating the julian date
-    julian = hebrew_to_jd(hebYear, hebMonth, hebDay)
-    weekday = (int(julian) + 2) % 7
-    return weekday
+# Holiday names
+ROSH_HASHANA = "RoshHashana"
+TZOM_GEDALIAH = "Tzom Gedaliah"
+YOM_KIPPUR = "Yom Kippur"
+SUKKOT = "Sukkot"
+CHOL_HAMOED_SUKKOT = "Chol HaMoed Sukkot"
+HOSHANA_RABBAH = "Hoshana Rabbah"
+SHEMINI_ATZERET = "Shemini Atzeret"
+SIMCHAT_TORAH = "SimchatTorah"
+CHANUKAH = "Chanukah"
+ASARA_BETEVET = "Asara BeTevet"
+TU_BISHVAT = "Tu BiShvat"
+TAANIT_ESTHER = "Taanit Esther"
+PURIM = "Purim"
+SHUSHAN_PURIM = "Shushan Purim"
+PESACH = "Pesach"
+CHOL_HAMOED_PESACH = "Chol HaMoed Pesach"
+LAG_BAOMER = "Lag BaOmer"
+SHAVUOT = "Shavuot"
+SHIVA_ASAR_BETAMMUZ = "Shiva Asar BeTammuz"
+TISHA_BEAV = "Tisha BeAv"
+ROSH_CHODESH = "Rosh Chodesh"
 
+# Holiday kinds
+YOM_TOV = 'yomtov'
+CHOL_HAMOED = 'cholhamoed'
+FAST = 'fast'
+MINOR = 'minor'
+ROSH_CHODESH_DAY = 'roshchodesh'
 
-def _get_hag_and_shabbat(g_day, g_month, g_year):
+Holiday = namedtuple('Holiday', ('name', 'kind'))
+
+HOLIDAY_YEAR_CACHE_SIZE = 32
+
+
+def _fast_day(year, month, day):
+    # Fasts that fall on Shabbat are postponed to Sunday
+    jd = year.jd(month, day)
+    return jd + 1 if weekday(jd) == 6 else jd
+
+
+@functools.lru_cache(maxsize=HOLIDAY_YEAR_CACHE_SIZE)
+def get_holiday_year(hebYear, diaspora=False):
+    """
+    Returns the holidays of a Hebrew year (Tishrei to Elul) as a dict of {julian date: (Holiday, ...)}.
+    In the diaspora the festivals have a second day, and Simchat Torah is on the day after Shemini Atzeret.
+    """
+    year = HebrewYear(hebYear)
+    adar = 13 if year.leap else 12
+    days = {}
+
+    def add(jd, name, kind):
+        days.setdefault(jd, []).append(Holiday(name, kind))
+
+    def add_festival(month, first, last, name, chol_hamoed):
+        # Yom tov on the first day (and the second, in the diaspora), Chol HaMoed until the last day
+        add(year.jd(month, first), name, YOM_TOV)
+        if diaspora:
+            add(year.jd(month, first + 1), name, YOM_TOV)
+        for day in range(first + (2 if diaspora else 1), last + 1):
+            add(year.jd(month, day), chol_hamoed, CHOL_HAMOED)
+
+    add(year.jd(7, 1), ROSH_HASHANA, YOM_TOV)
+    add(year.jd(7, 2), ROSH_HASHANA, YOM_TOV)
+    add(_fast_day(year, 7, 3), TZOM_GEDALIAH, FAST)
+    add(year.jd(7, 10), YOM_KIPPUR, YOM_TOV)
+    add_festival(7, 15, 20, SUKKOT, CHOL_HAMOED_SUKKOT)
+    add(year.jd(7, 21), HOSHANA_RABBAH, CHOL_HAMOED)
+    if diaspora:
+        add(year.jd(7, 22), SHEMINI_ATZERET, YOM_TOV)
+        add(year.jd(7, 23), SIMCHAT_TORAH, YOM_TOV)
+    else:
+        add(year.jd(7, 22), SIMCHAT_TORAH, YOM_TOV)
+    chanukah = year.jd(9, 25)
+    for day in range(8):
+        add(chanukah + day, CHANUKAH, MINOR)
+    add(year.jd(10, 10), ASARA_BETEVET, FAST)
+    add(year.jd(11, 15), TU_BISHVAT, MINOR)
+    esther = year.jd(adar, 13)
+    add(esther - 2 if weekday(esther) == 6 else esther, TAANIT_ESTHER, FAST)     # Moved back to Thursday
+    add(year.jd(adar, 14), PURIM, MINOR)
+    add(year.jd(adar, 15), SHUSHAN_PURIM, MINOR)
+    add_festival(1, 15, 20, PESACH, CHOL_HAMOED_PESACH)
+    add(year.jd(1, 21), PESACH, YOM_TOV)
+    if diaspora:
+        add(year.jd(1, 22), PESACH, YOM_TOV)
+    add(year.jd(2, 18), LAG_BAOMER, MINOR)
+    add(year.jd(3, 6), SHAVUOT, YOM_TOV)
+    if diaspora:
+        add(year.jd(3, 7), SHAVUOT, YOM_TOV)
+    add(_fast_day(year, 4, 17), SHIVA_ASAR_BETAMMUZ, FAST)
+    add(_fast_day(year, 5, 9), TISHA_BEAV, FAST)
+
+    # Rosh Chodesh is the 1st of every month but Tishrei, and also the 30th of the month before it (if it has one)
+    months = year.month_order
+    for previous, month in zip(months, months[1:]):
+        if year.month_days(previous) == 30:
+            add(year.jd(previous, 30), ROSH_CHODESH, ROSH_CHODESH_DAY)
+        add(year.jd(month, 1), ROSH_CHODESH, ROSH_CHODESH_DAY)
+
+    return {jd: tuple(holidays) for jd, holidays in days.items()}
+
+
+def get_holidays_jd(jd, diaspora=False):
+    """Returns the Holidays on a julian date (an empty tuple if there are none)"""
+    jd = int(jd) + 0.5
+    return get_holiday_year(jd_to_hebrew(jd)[0], diaspora).get(jd, ())
+
+
+def get_holidays(date, diaspora=False):
+    return get_holidays_jd(gregorian_to_jd(date.year, date.month, date.day), diaspora)
+
+
+def get_hag_jd(jd, shabbat=False, diaspora=False):
+    """Returns the name of the yom tov on a julian date, or '' if there is none"""
+    for holiday in get_holidays_jd(jd, diaspora):
+        if holiday.kind == YOM_TOV:
+            return holiday.name
+        if shabbat and holiday.kind == CHOL_HAMOED and holiday.name in (CHOL_HAMOED_SUKKOT, HOSHANA_RABBAH):
+            return SUKKOT       #Treat Shabbat on Sukkot like Sukkot (so the blinds don't go down)
+    return ''
+
+
+def _get_hag_and_shabbat(g_day, g_month, g_year, diaspora=False):
     julian = gregorian_to_jd(g_year, g_month, g_day)
-    hebYear, hebMonth, hebDay = jd_to_hebrew(julian)
-
-    shabbat = 'Shabbat' if _getWeekdayOfHebrewDate(hebDay, hebMonth, hebYear) == 6 else ''
-
-    # Holidays in Nisan
-    if hebDay == 15 and hebMonth == 1:
-        return "Pesach"
-    if hebDay == 21 and hebMonth == 1:
-        return "Pesach"
-
-    # Holidays in Sivan
-    if hebDay == 6 and hebMonth == 3:
-        return "Shavuot"
-
-    # Holidays in Tishri
-    if hebMonth == 7:
-        if hebDay == 1 or hebDay == 2:
-            return "RoshHashana"
-        elif hebDay == 10:
-            return "Yom Kippur"
-        elif hebDay == 15:
-            return "Sukkot"
-        elif 15 < hebDay < 22 and shabbat:     #Treat Shabbat on Sukkot like Sukkot (so the blinds don't go down)
-            return "Sukkot"
-        elif hebDay == 22:
-            return "SimchatTorah"
-
-    return shabbat
+
+    shabbat = 'Shabbat' if weekday(julian) == 6 else ''
+
+    return get_hag_jd(julian, shabbat, diaspora) or shabbat
 
 def test_calculate_holiday():
     #A test program for the holiday calculation:
@@ -61,26 +156,20 @@ def test_calculate_holiday():
             if hag:
                 print(str(day) + "/" + str(month) + "/" + str(year) + ": " + str(hag))
 
-def get_hag_and_shabbat(date):
-    return _get_hag_and_shabbat(date.day, date.month, date.year)
+def get_hag_and_shabbat(date, diaspora=False):
+    return _get_hag_and_shabbat(date.day, date.month, date.year, diaspora)
 
 # from common.date_utils_py2.times import today_sunrise_sunset
 # location = 'Azriel_wiki'
 # sunrise1, sunset1 = today_sunrise_sunset(location)
 # print(sunrise1, sunset1)
 
-def get_day_times(date=0):
-    '''Returns sunrise, sunset, shaa, day, night'''
-    tz_offset = -time.altzone / 60 / 60
-
+def get_day_times(date=0, location=None, precision=PRECISION_LOW):
+    '''Returns sunrise, sunset, shaa, day, night. location is a registered location name (the default location if None)'''
     if not date:
         date = datetime.now()
 
-    location = (3215, 3458, tz_offset, 53)  # Azriel_wiki, Israel, 32 deg 15 min N, 34 deg 58 min E, Asia/Jerusalem, 53
-    sunrise = GetSunrise(date.month, date.day, date.year, location)
-    sunset = GetSunset(date.month, date.day, date.year, location)
-    shaa = GetShaaZmanit(sunrise, sunset)
+    sunrise, sunset, shaa = get_zmanim_table(date.year, get_location(location), precision).day_times(date)
     day = Dayhours(sunrise, sunset)
     night = Nighthours(sunrise, sunset)
-    print('sunrise: %s, sunset: %s, shaa-zmanit: %s, day-hours: %s, night-hours: %s' % (sunrise, sunset, shaa, day, night))
     return sunrise, sunset, shaa, day, night
@@ -0,0 +1,84 @@
+#  locations.py: Registry of the locations zmanim are computed for.
+#
+# A Location can be used wherever sun.py takes a location tuple (latitude, longitude, timezone, elevation),
+# except that its timezone is an IANA name (e.g. 'Asia/Jerusalem'), so the UTC offset follows DST per day.
+# latitude and longitude are in sun.py's format: degrees * 100 + minutes, north and east positive.
+#
+import datetime
+import functools
+from collections import namedtuple
+
+import numpy as np
+import pytz
+
+Location = namedtuple('Location', ('latitude', 'longitude', 'timezone', 'elevation'))
+
+LOCATIONS = {}
+
+DEFAULT_LOCATION = 'Azriel'
+
+UTC_OFFSETS_CACHE_SIZE = 64
+
+
+def register_location(name, latitude, longitude, timezone, elevation=0):
+    pytz.timezone(timezone)             # Fail early on an unknown timezone
+    LOCATIONS[name] = Location(latitude, longitude, timezone, elevation)
+    return LOCATIONS[name]
+
+
+def get_location(location=None):
+    """Returns a registered Location by name (the default location if None). A Location or location tuple is returned as is"""
+    if location is None:
+        location = DEFAULT_LOCATION
+    if isinstance(location, tuple):
+        return location
+    return LOCATIONS[location]
+
+
+@functools.lru_cache(maxsize=UTC_OFFSETS_CACHE_SIZE)
+def get_utc_offsets(timezone, year):
+    """
+    Returns the UTC offset (in hours) at noon of every day of a Gregorian year in an IANA timezone, as a read-only array.
+    Only the DST transitions of the year are looked up; the days between them share their offset.
+    """
+    tz = pytz.timezone(timezone)
+    first = datetime.date(year, 1, 1)
+    days = datetime.date(year + 1, 1, 1).toordinal() - first.toordinal()
+
+    def offset(day):
+        noon = datetime.datetime.combine(first + datetime.timedelta(day), datetime.time(12))
+        return tz.localize(noon, is_dst=False).utcoffset().total_seconds() / 3600
+
+    offsets = np.empty(days)
+    for start, end in _transition_ranges(tz, year, days):
+        offsets[start:end] = offset(start)
+    offsets.flags.writeable = False
+    return offsets
+
+
+def _transition_ranges(tz, year, days):
+    # Splits the days of the year into ranges with no DST transition, using the timezone's transition table
+    first = datetime.datetime(year, 1, 1)
+    cuts = set()
+    for transition in getattr(tz, '_utc_transition_times', ()):
+        if transition.year == year:
+            # The offset at noon changes on the day of the transition or the one after
+            cuts.add((transition - first).days + 1)
+            cuts.add((transition - first).days)
+    bounds = [0] + sorted(cut for cut in cuts if 0 < cut < days) + [days]
+    return zip(bounds, bounds[1:])
+
+
+def get_utc_offset(timezone, date):
+    return float(get_utc_offsets(timezone, date.year)[date.toordinal() - datetime.date(date.year, 1, 1).toordinal()])
+
+
+def sun_location(location, date):
+    """Returns the sun.py location tuple of a Location on a date (with the day's UTC offset)"""
+    latitude, longitude, timezone, elevation = location
+    if isinstance(timezone, str):
+        timezone = get_utc_offset(timezone, date)
+    return latitude, longitude, timezone, elevation
+
+
+register_location('Azriel', 3215, 3458, 'Asia/Jerusalem', 53)      # Azriel_wiki, Israel, 32 deg 15 min N, 34 deg 58 min E
@@ -20,7 +20,11 @@
 # else:
 #   print "Syntax: python sample.py <Day> <Month> <Year> <Diaspora flag: y = Diaspora, n = Israel>"
 
+import functools
+from collections import namedtuple
 from common.date_utils import calendar_util
+from common.jewish_dates import hebrew_year
+from common.jewish_dates.hebrew_year import HebrewYear
 
 ID_BERESHITH                   = 0
 ID_NOAH                        = 1
@@ -1319,206 +1323,163 @@ torahSectionsNIsrael = \
    ID_SHEMINI_AZERETH,     ID_NULL,    ID_NULL]     # 55
 
 def torahGetWeekday(absDate):
-  wochentag = (int(absDate) + 2) % 7
-  return wochentag
+  return hebrew_year.weekday(absDate)
 
 def torahHebrewLeapYear(year):
-  return calendar_util.hebrew_leap(year)
+  return HebrewYear(year).leap
 
 def torahLastMonthOfHebrewYear(year):
-  return calendar_util.hebrew_year_months(year)
+  return HebrewYear(year).months
 
 def getYearType(year):
-  rhWeekday = torahGetWeekday(calendar_util.hebrew_to_jd(year, 7, 1))
-  lengthOfYear = int(calendar_util.hebrew_to_jd(year+1, 7, 1) - calendar_util.hebrew_to_jd(year, 7, 1))
-  pesWeekday = torahGetWeekday(calendar_util.hebrew_to_jd(year, 1, 15))
-
-  if ((rhWeekday == 1) and (lengthOfYear == 353) and (pesWeekday == 2)):
-    return 1
-  if ((rhWeekday == 6) and (lengthOfYear == 353) and (pesWeekday == 0)):
-    return 2
-  if ((rhWeekday == 2) and (lengthOfYear == 354) and (pesWeekday == 4)):
-    return 3
-  if ((rhWeekday == 4) and (lengthOfYear == 354) and (pesWeekday == 6)):
-    return 4
-  if ((rhWeekday == 1) and (lengthOfYear == 355) and (pesWeekday == 4)):
-    return 5
-  if ((rhWeekday == 4) and (lengthOfYear == 355) and (pesWeekday == 0)):
-    return 6
-  if ((rhWeekday == 6) and (lengthOfYear == 355) and (pesWeekday == 2)):
-    return 7
-
-  if ((rhWeekday == 1) and (lengthOfYear == 383) and (pesWeekday == 4)):
-    return 8
-  if ((rhWeekday == 4) and (lengthOfYear == 383) and (pesWeekday == 0)):
-    return 9
-  if ((rhWeekday == 6) and (lengthOfYear == 383) and (pesWeekday == 2)):
-    return 10
-  if ((rhWeekday == 2) and (lengthOfYear == 384) and (pesWeekday == 6)):
-    return 11
-  if ((rhWeekday == 1) and (lengthOfYear == 385) and (pesWeekday == 6)):
-    return 12
-  if ((rhWeekday == 4) and (lengthOfYear == 385) and (pesWeekday == 2)):
-    return 13
-  if ((rhWeekday == 6) and (lengthOfYear == 385) and (pesWeekday == 4)):
-   return 14
-
-  return 0
+  return HebrewYear(year).year_type
 
 def determineBereshith(year):
-  simchatTorah = calendar_util.hebrew_to_jd(year, 7, 23)
-  while (torahGetWeekday(simchatTorah) != 6):
-    simchatTorah += 1
-  return (simchatTorah)
+  return HebrewYear(year).bereshith
 
-def getTorahSections(hebrewMonth, hebrewDay, hebrewYear, diaspora):
-  shuvahDate = calendar_util.hebrew_to_jd(hebrewYear, 7, 1) + 1
-  while (torahGetWeekday(shuvahDate) != 6):
-    shuvahDate += 1
+# Schedules per (yearType, diaspora)
+# allgemein: A, B, F, G, I, J, M
+# Israel/Diaspora: C, D, E, H, K, L, N
+torahSchedules = {
+  (1, False): torahSectionsA,           (1, True): torahSectionsA,
+  (2, False): torahSectionsB,           (2, True): torahSectionsB,
+  (3, False): torahSectionsCIsrael,     (3, True): torahSectionsCDiaspora,
+  (4, False): torahSectionsDIsrael,     (4, True): torahSectionsDDiaspora,
+  (5, False): torahSectionsEIsrael,     (5, True): torahSectionsEDiaspora,
+  (6, False): torahSectionsF,           (6, True): torahSectionsF,
+  (7, False): torahSectionsG,           (7, True): torahSectionsG,
+  (8, False): torahSectionsHIsrael,     (8, True): torahSectionsHDiaspora,
+  (9, False): torahSectionsI,           (9, True): torahSectionsI,
+  (10, False): torahSectionsJ,          (10, True): torahSectionsJ,
+  (11, False): torahSectionsKIsrael,    (11, True): torahSectionsKDiaspora,
+  (12, False): torahSectionsLIsrael,    (12, True): torahSectionsLDiaspora,
+  (13, False): torahSectionsM,          (13, True): torahSectionsM,
+  (14, False): torahSectionsNIsrael,    (14, True): torahSectionsNDiaspora,
+}
 
-  torahDate = calendar_util.hebrew_to_jd(hebrewYear, hebrewMonth, hebrewDay)
-  if (torahGetWeekday(torahDate) == 6):
-    bereshithDate = determineBereshith(hebrewYear)
-    if (torahDate < bereshithDate):
-      referenceYear = hebrewYear-1
-    else:
-      referenceYear = hebrewYear
+# The schedules above compiled into one bytes block, indexed by (yearType, diaspora, torahWeekNo, slot):
+#   torahTable[((yearType * 2 + diaspora) * TORAH_TABLE_WEEKS + torahWeekNo) * 3 + slot]
+# Year type 0 (not a valid year) and the weeks past the end of a schedule hold TORAH_TABLE_NULL (ID_NULL).
+# The lists stay the readable source, and are what getTorahSectionIdsReference reads.
+TORAH_TABLE_NULL = 0xFF
+TORAH_TABLE_WEEKS = max(len(schedule) for schedule in torahSchedules.values()) // 3
 
-    yearType = getYearType(referenceYear)
-    bereshithDate = determineBereshith(referenceYear)
-    torahWeekNo = int(torahDate-bereshithDate)//7
+def compileTorahTable():
+  table = bytearray([TORAH_TABLE_NULL]) * (15 * 2 * TORAH_TABLE_WEEKS * 3)
+  for (yearType, diaspora), schedule in torahSchedules.items():
+    base = (yearType * 2 + diaspora) * TORAH_TABLE_WEEKS * 3
+    for i, idTorah in enumerate(schedule):
+      if (idTorah != ID_NULL):
+        table[base + i] = idTorah
+  return bytes(table)
 
-    returnTorahSection = ""
-    idTorah1 = ID_NULL
-    idTorah2 = ID_NULL
-    idTorah3 = ID_NULL
-#
-# allgemein: A, B, F, G, I, J, M
-# Israel/Diaspora: C, D, E, H, K, L, N
-#
-
-    if (yearType == 1): # A
-      idTorah1 = torahSectionsA[torahWeekNo * 3 + 0]
-      idTorah2 = torahSectionsA[torahWeekNo * 3 + 1]
-      idTorah3 = torahSectionsA[torahWeekNo * 3 + 2]
-    if (yearType == 2): # B
-      idTorah1 = torahSectionsB[torahWeekNo * 3 + 0]
-      idTorah2 = torahSectionsB[torahWeekNo * 3 + 1]
-      idTorah3 = torahSectionsB[torahWeekNo * 3 + 2]
-    if (yearType == 3): # C
-      if diaspora:
-        idTorah1 = torahSectionsCDiaspora[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsCDiaspora[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsCDiaspora[torahWeekNo * 3 + 2]
-      else:
-        idTorah1 = torahSectionsCIsrael[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsCIsrael[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsCIsrael[torahWeekNo * 3 + 2]
-    if (yearType == 4): # D
-      if diaspora:
-        idTorah1 = torahSectionsDDiaspora[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsDDiaspora[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsDDiaspora[torahWeekNo * 3 + 2]
-      else:
-        idTorah1 = torahSectionsDIsrael[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsDIsrael[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsDIsrael[torahWeekNo * 3 + 2]
-    if (yearType == 5): # E
-      if diaspora:
-        idTorah1 = torahSectionsEDiaspora[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsEDiaspora[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsEDiaspora[torahWeekNo * 3 + 2]
-      else:
-        idTorah1 = torahSectionsEIsrael[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsEIsrael[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsEIsrael[torahWeekNo * 3 + 2]
-    if (yearType == 6): # F
-      idTorah1 = torahSectionsF[torahWeekNo * 3 + 0]
-      idTorah2 = torahSectionsF[torahWeekNo * 3 + 1]
-      idTorah3 = torahSectionsF[torahWeekNo * 3 + 2]
-    if (yearType == 7): # G
-      idTorah1 = torahSectionsG[torahWeekNo * 3 + 0]
-      idTorah2 = torahSectionsG[torahWeekNo * 3 + 1]
-      idTorah3 = torahSectionsG[torahWeekNo * 3 + 2]
-    if (yearType == 8): # H
-      if diaspora:
-        idTorah1 = torahSectionsHDiaspora[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsHDiaspora[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsHDiaspora[torahWeekNo * 3 + 2]
-      else:
-        idTorah1 = torahSectionsHIsrael[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsHIsrael[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsHIsrael[torahWeekNo * 3 + 2]
-    if (yearType == 9): # I
-      idTorah1 = torahSectionsI[torahWeekNo * 3 + 0]
-      idTorah2 = torahSectionsI[torahWeekNo * 3 + 1]
-      idTorah3 = torahSectionsI[torahWeekNo * 3 + 2]
-    if (yearType == 10): # J
-      idTorah1 = torahSectionsJ[torahWeekNo * 3 + 0]
-      idTorah2 = torahSectionsJ[torahWeekNo * 3 + 1]
-      idTorah3 = torahSectionsJ[torahWeekNo * 3 + 2]
-    if (yearType == 11): # K
-      if (diaspora):
-        idTorah1 = torahSectionsKDiaspora[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsKDiaspora[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsKDiaspora[torahWeekNo * 3 + 2]
-      else:
-        idTorah1 = torahSectionsKIsrael[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsKIsrael[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsKIsrael[torahWeekNo * 3 + 2]
-    if (yearType == 12): # L
-      if (diaspora):
-        idTorah1 = torahSectionsLDiaspora[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsLDiaspora[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsLDiaspora[torahWeekNo * 3 + 2]
-      else:
-        idTorah1 = torahSectionsLIsrael[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsLIsrael[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsLIsrael[torahWeekNo * 3 + 2]
-    if (yearType == 13): # M
-      idTorah1 = torahSectionsM[torahWeekNo * 3 + 0]
-      idTorah2 = torahSectionsM[torahWeekNo * 3 + 1]
-      idTorah3 = torahSectionsM[torahWeekNo * 3 + 2]
-    if (yearType == 14): # N
-      if diaspora:
-        idTorah1 = torahSectionsNDiaspora[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsNDiaspora[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsNDiaspora[torahWeekNo * 3 + 2]
-      else:
-        idTorah1 = torahSectionsNIsrael[torahWeekNo * 3 + 0]
-        idTorah2 = torahSectionsNIsrael[torahWeekNo * 3 + 1]
-        idTorah3 = torahSectionsNIsrael[torahWeekNo * 3 + 2]
-
-    print('ids:', idTorah1, idTorah2, idTorah3)
-
-    if (idTorah1 != ID_NULL):
-      torahSection = getTorahSectionName(idTorah1)
-      print('torahSection:', torahSection)
-      if (torahSection != ""):
-        if (returnTorahSection != ""):
-          returnTorahSection = returnTorahSection + ", "
-        returnTorahSection = returnTorahSection + torahSection
-    if (idTorah2 != ID_NULL):
-      torahSection = getTorahSectionName(idTorah2)
-      if (torahSection != ""):
-        if (returnTorahSection != ""):
-          returnTorahSection = returnTorahSection + ", "
-        returnTorahSection = returnTorahSection + torahSection
-    if (idTorah3 != ID_NULL):
-      torahSection = getTorahSectionName(idTorah3)
-      if (torahSection != ""):
-        if (returnTorahSection != ""):
-          returnTorahSection = returnTorahSection + ", "
-        returnTorahSection = returnTorahSection + torahSection
+torahTable = compileTorahTable()
+
+def torahSectionIds(yearType, torahWeekNo, diaspora):
+  # Returns the section IDs (without ID_NULL) read on week torahWeekNo after Bereshith of a year of type yearType
+  if (torahWeekNo >= TORAH_TABLE_WEEKS):
+    return ()
+  index = ((yearType * 2 + bool(diaspora)) * TORAH_TABLE_WEEKS + torahWeekNo) * 3
+  return tuple(idTorah for idTorah in torahTable[index:index + 3] if idTorah != TORAH_TABLE_NULL)
+
+# Number of (hebrewYear, diaspora) tables kept by getTorahYear
+TORAH_YEAR_CACHE_SIZE = 32
+
+# The Shabbatot of a Hebrew year (Rosh Hashana up to the next Rosh Hashana):
+# sections[i] holds the section IDs read on the JD firstShabbat + 7*i, and dates maps (hebrewMonth, hebrewDay) to i
+TorahYear = namedtuple('TorahYear', ('hebrewYear', 'diaspora', 'firstShabbat', 'sections', 'dates'))
 
+@functools.lru_cache(maxsize=TORAH_YEAR_CACHE_SIZE)
+def getTorahYear(hebrewYear, diaspora):
+  year = HebrewYear(hebrewYear)
+  previousYear = HebrewYear(hebrewYear - 1)
+  roshHashana = year.rosh_hashana
+  nextRoshHashana = roshHashana + year.length
+
+  firstShabbat = roshHashana
+  while (torahGetWeekday(firstShabbat) != 6):
+    firstShabbat += 1
+  shuvahDate = firstShabbat if firstShabbat != roshHashana else firstShabbat + 7
+
+  # Month lengths in calendar order, starting from Tishrei
+  months = year.month_order
+  monthDays = [year.month_days(month) for month in months]
+
+  sections = []
+  dates = {}
+  monthIndex = 0
+  hebrewDay = int(firstShabbat - roshHashana) + 1
+  torahDate = firstShabbat
+  while (torahDate < nextRoshHashana):
+    # Shabbatot before Bereshith still belong to the previous year's reading cycle
+    if (torahDate < year.bereshith):
+      ids = torahSectionIds(previousYear.year_type, int(torahDate - previousYear.bereshith) // 7, diaspora)
+    else:
+      ids = torahSectionIds(year.year_type, int(torahDate - year.bereshith) // 7, diaspora)
     if (torahDate == shuvahDate):
+      ids += (ID_SHUVA,)
+
+    dates[(months[monthIndex], hebrewDay)] = len(sections)
+    sections.append(ids)
+
+    torahDate += 7
+    hebrewDay += 7
+    while (monthIndex < len(months) - 1 and hebrewDay > monthDays[monthIndex]):
+      hebrewDay -= monthDays[monthIndex]
+      monthIndex += 1
+
+  return TorahYear(hebrewYear, bool(diaspora), firstShabbat, tuple(sections), dates)
+
+def getTorahSectionIds(hebrewMonth, hebrewDay, hebrewYear, diaspora):
+  # Returns the section IDs read on the given date, or () if it is not a Shabbat
+  torahYear = getTorahYear(hebrewYear, diaspora)
+  week = torahYear.dates.get((hebrewMonth, hebrewDay))
+  if (week is None):
+    return ()
+  return torahYear.sections[week]
+
+def getTorahSectionIdsReference(hebrewMonth, hebrewDay, hebrewYear, diaspora):
+  # The original per-date computation, using calendar_util only (no HebrewYear, no caches).
+  # Kept as the reference getTorahSectionIds is verified against (see common.verification)
+  def yearType(year):
+    roshHashana = calendar_util.hebrew_to_jd(year, 7, 1)
+    lengthOfYear = int(calendar_util.hebrew_to_jd(year + 1, 7, 1) - roshHashana)
+    pesWeekday = hebrew_year.weekday(calendar_util.hebrew_to_jd(year, 1, 15))
+    return hebrew_year.YEAR_TYPES.get((hebrew_year.weekday(roshHashana), lengthOfYear, pesWeekday), 0)
+
+  def bereshith(year):
+    simchatTorah = calendar_util.hebrew_to_jd(year, 7, 23)
+    while (hebrew_year.weekday(simchatTorah) != 6):
+      simchatTorah += 1
+    return simchatTorah
+
+  torahDate = calendar_util.hebrew_to_jd(hebrewYear, hebrewMonth, hebrewDay)
+  if (hebrew_year.weekday(torahDate) != 6):
+    return ()
+
+  shuvahDate = calendar_util.hebrew_to_jd(hebrewYear, 7, 1) + 1
+  while (hebrew_year.weekday(shuvahDate) != 6):
+    shuvahDate += 1
+
+  referenceYear = hebrewYear - 1 if torahDate < bereshith(hebrewYear) else hebrewYear
+  torahWeekNo = int(torahDate - bereshith(referenceYear)) // 7
+  schedule = torahSchedules.get((yearType(referenceYear), bool(diaspora)))
+  ids = ()
+  if schedule is not None:
+    ids = tuple(idTorah for idTorah in schedule[torahWeekNo * 3:torahWeekNo * 3 + 3] if idTorah != ID_NULL)
+  if (torahDate == shuvahDate):
+    ids += (ID_SHUVA,)
+  return ids
+
+def getTorahSections(hebrewMonth, hebrewDay, hebrewYear, diaspora):
+  returnTorahSection = ""
+  for idTorah in getTorahSectionIds(hebrewMonth, hebrewDay, hebrewYear, diaspora):
+    torahSection = getTorahSectionName(idTorah)
+    if (torahSection != ""):
       if (returnTorahSection != ""):
         returnTorahSection = returnTorahSection + ", "
-      returnTorahSection = returnTorahSection + getTorahSectionName(ID_SHUVA)
-
-    return (returnTorahSection)
-  else:
-    return ""
+      returnTorahSection = returnTorahSection + torahSection
+  return (returnTorahSection)
 
 def getTorahSectionName(section):
   if (section == ID_BERESHITH):
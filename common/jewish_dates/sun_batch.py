@@ -0,0 +1,172 @@
+#  sun_batch.py: NumPy versions of the sun.py rise/set computations.
+#
+# The functions take arrays of Gregorian years, months and days (or anything numpy.asarray accepts) and a
+# location tuple (latitude, longitude, timezone, elevation) as used by sun.py. Times are returned in minutes
+# from midnight, with NO_TIME where sun.py has no result. The arithmetic follows sun.suntime step by step
+# (including its rounding and the 12-hour folding of GetSunrise/GetSunset), so results match the scalar
+# functions to the minute.
+#
+import numpy as np
+
+NO_TIME = -1
+
+_MONTH_COUNT = np.array([0, 1, 32, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335, 366])
+_EARTH_RADIUS_IN_METERS = 6356.9 * 1000.0
+
+
+def _ints(*args):
+    return np.broadcast_arrays(*[np.asarray(a, dtype=np.int64) for a in args])
+
+
+def leap(year):
+    return (year % 400 == 0) | ((year % 100 != 0) & (year % 4 == 0))
+
+
+def doy(day, month, year):
+    day, month, year = _ints(day, month, year)
+    return _MONTH_COUNT[month] + day + ((month > 2) & leap(year))
+
+
+def _todec(deg, min):
+    return deg + min / 60.0
+
+
+def _M(x):
+    return 0.9856 * x - 3.251
+
+
+def _L(x):
+    return x + 1.916 * np.sin(0.01745 * x) + 0.02 * np.sin(2 * 0.01745 * x) + 282.565
+
+
+def _adj(x):
+    return -0.06571 * x - 6.620
+
+
+def _coordinates(location):
+    # (latitude, longitude) in degrees, signed as sun.suntime uses them (east longitudes are negative)
+    latitude, longitude = location[0], location[1]
+    lon = _todec(int(abs(longitude) // 100), abs(longitude) % 100)
+    if longitude >= 0:
+        lon *= -1
+    lat = _todec(int(abs(latitude) // 100), abs(latitude) % 100)
+    if latitude < 0:
+        lat *= -1
+    return lat, lon
+
+
+def _zenith(zendeg, zenmin, elevation):
+    # The zenith (in degrees) of sun.suntime, which adds the horizon dip for elevation only at 90 degrees
+    if zendeg == 90:
+        z = zendeg + zenmin / 60.0
+        z += np.degrees(np.arccos(_EARTH_RADIUS_IN_METERS / (_EARTH_RADIUS_IN_METERS + elevation)))
+        zendeg = np.floor(z)
+        zenmin = (z - np.floor(z)) * 60
+    return _todec(zendeg, zenmin)
+
+
+def _ascension(xl):
+    a = 57.29578 * np.arctan(0.91746 * np.tan(0.01745 * xl))
+    a = np.where(np.abs(a + 360.0 - xl) > 90.0, a + 180.0, a)
+    return np.where(a > 360.0, a - 360.0, a)
+
+
+def _hour_angle(xl, cosz, sinlat, coslat):
+    sindec = 0.39782 * np.sin(0.01745 * xl)
+    cosdec = np.sqrt(1.0 - sindec * sindec)
+    return (cosz - sindec * sinlat) / (cosdec * coslat)
+
+
+def suntime(day, zendeg, zenmin, location):
+    """
+    Array version of sun.suntime for an array of days of the year (see doy).
+    Returns (rise, set) in hours (UT + timezone), NaN where sun.suntime returns None.
+    """
+    day = np.asarray(day, dtype=np.float64)
+    timezone, elevation = location[2], location[3]
+    cosz = np.cos(0.01745 * _zenith(zendeg, zenmin, elevation))
+
+    latitude, longitude = _coordinates(location)
+    lonhr = longitude / 15.0
+    coslat = np.cos(0.01745 * latitude)
+    sinlat = np.sin(0.01745 * latitude)
+
+    t_rise = day + (6.0 + lonhr) / 24.0
+    t_set = day + (18.0 + lonhr) / 24.0
+    xl_rise = _L(_M(t_rise))
+    xl_set = _L(_M(t_set))
+
+    h_rise = _hour_angle(xl_rise, cosz, sinlat, coslat)
+    h_set = _hour_angle(xl_set, cosz, sinlat, coslat)
+    valid = (np.abs(h_rise) <= 1.0) & (np.abs(h_set) <= 1.0)
+    h_rise = 57.29578 * np.arccos(np.where(valid, h_rise, 0.0))
+
+    # Both use the rise hour angle, as in sun.suntime
+    ut_rise = ((360.0 - h_rise) / 15.0) + _ascension(xl_rise) / 15.0 + _adj(t_rise) + lonhr
+    ut_set = (h_rise / 15.0) + _ascension(xl_set) / 15.0 + _adj(t_set) + lonhr
+
+    return np.where(valid, ut_rise + timezone, np.nan), np.where(valid, ut_set + timezone, np.nan)
+
+
+def timeadj(t):
+    """Array version of sun.timeadj, returning (hour, minute) int arrays (garbage where t is NaN)"""
+    t = np.where(t < 0, t + 24.0, t)
+    t = np.where(np.isnan(t), 0.0, t)
+    hour = np.floor(t).astype(np.int64)
+    minute = np.floor((t - hour) * 60.0 + 0.5).astype(np.int64)
+    hour = np.where(minute >= 60, hour + 1, hour)
+    minute = np.where(minute >= 60, minute - 60, minute)
+    hour = np.where(hour > 24, hour - 24, hour)
+    return hour, minute
+
+
+def _fold_pm(hour):
+    # while (hour > 12): hour -= 12
+    return np.where(hour > 12, (hour - 1) % 12 + 1, hour)
+
+
+def _fold_am(hour):
+    # while (hour < 12): hour += 12
+    return np.where(hour < 12, hour + 12 * ((12 - hour + 11) // 12), hour)
+
+
+def sunrise_sunset(year, month, day, location):
+    """Returns (sunrise, sunset) in minutes from midnight, as sun.GetSunrise/GetSunset"""
+    days = doy(day, month, year)
+    rise, set = suntime(days, 90, 50, location)
+    valid = ~np.isnan(rise)
+
+    hour, minute = timeadj(rise)
+    sunrise = _fold_pm(hour) * 60 + minute
+    hour, minute = timeadj(set)
+    sunset = _fold_am(hour) * 60 + minute
+    return np.where(valid, sunrise, NO_TIME), np.where(valid, sunset, NO_TIME)
+
+
+def degrees_below_horizon_add(year, month, day, degrees, location):
+    """Returns the minutes between sunset and the sun being degrees below the horizon, as sun.GetDegreesBelowHorizonAdd"""
+    days = doy(day, month, year)
+
+    hour, minute = timeadj(suntime(days, 90, 50, location)[1])
+    sunset = _fold_pm(hour) * 60 + minute
+
+    db = degrees + 90.0
+    deghour = np.floor(db)
+    degmin = np.floor((db - deghour) * 60.0)
+    set = suntime(days, deghour, degmin, location)[1]
+    hour, minute = timeadj(set)
+    return np.where(np.isnan(set), NO_TIME, _fold_pm(hour) * 60 + minute - sunset)
+
+
+def sunrise_degrees_below_horizon(year, month, day, degrees, location):
+    """As sun.GetSunriseDegreesBelowHorizon, in minutes from midnight"""
+    sunrise = sunrise_sunset(year, month, day, location)[0]
+    adding = degrees_below_horizon_add(year, month, day, degrees, location)
+    return np.where((sunrise == NO_TIME) | (adding == NO_TIME), NO_TIME, sunrise - adding)
+
+
+def sunset_degrees_below_horizon(year, month, day, degrees, location):
+    """As sun.GetSunsetDegreesBelowHorizon, in minutes from midnight"""
+    sunset = sunrise_sunset(year, month, day, location)[1]
+    adding = degrees_below_horizon_add(year, month, day, degrees, location)
+    return np.where((sunset == NO_TIME) | (adding == NO_TIME), NO_TIME, sunset + adding)
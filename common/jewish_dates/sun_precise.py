@@ -0,0 +1,93 @@
+#  sun_precise.py: Sunrise, sunset and degree-based times from astro.sunpos (Meeus), for the high-precision zmanim.
+#
+# The event time is found by iterating on the hour angle of the Sun's apparent declination at the event, with the
+# equation of time (right ascension, nutation in longitude and obliquity) evaluated at the same moment in
+# dynamical time. Nutation and the mean obliquity change by well under an arc-second a day, so they are computed
+# once per day (at noon) and cached; this is the expensive part of astro.equationOfTime.
+#
+# location is a sun.py location tuple (latitude, longitude, timezone, elevation) with a numeric timezone.
+# Times are returned in minutes from midnight (rounded like sun.timeadj), or NO_TIME.
+#
+import functools
+import math
+
+from common.date_utils import astro
+from common.date_utils.calendar_util import gregorian_to_jd
+
+NO_TIME = -1
+
+ITERATIONS = 3
+DAY_TERMS_CACHE_SIZE = 2048
+
+_EARTH_RADIUS_IN_METERS = 6356.9 * 1000.0
+
+
+def _decimal(value):
+    # sun.py's degrees * 100 + minutes format to decimal degrees
+    degrees = abs(value) // 100 + (abs(value) % 100) / 60.0
+    return -degrees if value < 0 else degrees
+
+
+@functools.lru_cache(maxsize=DAY_TERMS_CACHE_SIZE)
+def day_terms(day):
+    """Returns (deltaPsi, obliquity) in degrees at an integer julian day (noon), in dynamical time"""
+    delta_psi, delta_epsilon = astro.nutation(day)
+    return delta_psi, astro.obliqeq(day) + delta_epsilon
+
+
+def _equation_of_time(jd):
+    # As astro.equationOfTime (in minutes), with the per-day nutation/obliquity from day_terms.
+    # Also returns the Sun's apparent declination.
+    tau = (jd - astro.J2000) / astro.JulianMillennium
+    L0 = astro.fixangle(280.4664567 + (360007.6982779 * tau) + (0.03032028 * tau * tau) +
+                        ((tau * tau * tau) / 49931) + (-((tau * tau * tau * tau) / 15300)) +
+                        (-((tau * tau * tau * tau * tau) / 2000000)))
+    position = astro.sunpos(jd)
+    delta_psi, epsilon = day_terms(int(jd))
+    E = L0 + (-0.0057183) + (-position[10]) + (delta_psi * astro.dcos(epsilon))
+    E = (E + 180.0) % 360.0 - 180.0
+    return E * 4, position[11]
+
+
+def event(date, zenith, rising, location):
+    """Returns the local time (minutes from midnight, as a float) the Sun is at zenith degrees on a date, or None"""
+    latitude, longitude, timezone, elevation = location
+    latitude = math.radians(_decimal(latitude))
+    longitude = _decimal(longitude)
+    midnight = gregorian_to_jd(date.year, date.month, date.day) - 0.5            # 0h UT
+    delta_t = astro.deltat(date.year + (date.month - 0.5) / 12) / 86400.0
+    cosz = math.cos(math.radians(zenith))
+
+    minutes = 720 - 4 * longitude + (-360 if rising else 360)                    # UT guess
+    for i in range(ITERATIONS):
+        equation, declination = _equation_of_time(midnight + minutes / 1440.0 + delta_t)
+        declination = math.radians(declination)
+        cos_h = (cosz - math.sin(latitude) * math.sin(declination)) / (math.cos(latitude) * math.cos(declination))
+        if abs(cos_h) > 1.0:
+            return None
+        hour_angle = math.degrees(math.acos(cos_h)) * 4
+        minutes = 720 - 4 * longitude - equation + (-hour_angle if rising else hour_angle)
+    return minutes + timezone * 60
+
+
+def _round(minutes):
+    return NO_TIME if minutes is None else int(math.floor(minutes + 0.5)) % 1440
+
+
+def horizon_zenith(elevation):
+    """The zenith of sunrise/sunset: 90 deg 50 min plus the dip of the horizon for the elevation (as in sun.suntime)"""
+    return 90 + 50 / 60.0 + math.degrees(math.acos(_EARTH_RADIUS_IN_METERS / (_EARTH_RADIUS_IN_METERS + elevation)))
+
+
+def sunrise_sunset(date, location):
+    """Returns (sunrise, sunset) in minutes from midnight"""
+    zenith = horizon_zenith(location[3])
+    return _round(event(date, zenith, True, location)), _round(event(date, zenith, False, location))
+
+
+def sunrise_degrees_below_horizon(date, degrees, location):
+    return _round(event(date, 90.0 + degrees, True, location))
+
+
+def sunset_degrees_below_horizon(date, degrees, location):
+    return _round(event(date, 90.0 + degrees, False, location))
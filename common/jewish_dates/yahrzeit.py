@@ -0,0 +1,49 @@
+#  yahrzeit.py: The dates of yahrzeits (anniversaries of a death, by the Hebrew date) in a Hebrew year.
+#
+# Only the Hebrew month and day of the death are known (not its year), so the customary rules are applied
+# to the month and day alone:
+#   - Adar II in a common year is kept in Adar; Adar (I) in a leap year is kept in Adar I.
+#   - 30 Adar I in a common year (which has no 30 Adar) is observed on 30 Shvat.
+#   - 30 Cheshvan/Kislev in a year where that month has 29 days is observed on the 29th.
+#
+# Months are numbered as in calendar_util (1=Nisan, 7=Tishrei, 12=Adar/Adar I, 13=Adar II).
+# All the functions take arrays of months and days, and work on all of them at once.
+#
+import numpy as np
+
+from common.date_utils import calendar_batch
+
+NO_DATE = 0         # The julian date returned for a month/day that is not a date (e.g. month 14, day 31)
+
+_ADAR = 12
+_ADAR2 = 13
+_SHVAT = 11
+
+
+def observed_dates(hebYear, month, day):
+    """
+    Returns (month, day) arrays of the Hebrew dates in hebYear on which the yahrzeits of these death months/days are observed.
+    Invalid months/days are returned as month 0.
+    """
+    month, day = np.broadcast_arrays(np.asarray(month, dtype=np.int64), np.asarray(day, dtype=np.int64))
+    month, day = month.copy(), day.copy()
+    valid = (month >= 1) & (month <= 13) & (day >= 1) & (day <= 30)
+    month[~valid] = 0
+
+    if not calendar_batch.hebrew_leap(hebYear):
+        shvat = (month == _ADAR) & (day == 30)
+        month[shvat] = _SHVAT
+        month[month == _ADAR2] = _ADAR
+
+    # Any other 30th of a month that has 29 days this year (Cheshvan and Kislev vary from year to year)
+    month_days = calendar_batch.hebrew_month_days(np.full(month.shape, hebYear), np.where(valid, month, 1))
+    day = np.where(valid & (day > month_days), month_days, day)
+    return month, day
+
+
+def yahrzeit_jds(hebYear, month, day):
+    """Returns an array of the julian dates of the yahrzeits in hebYear (NO_DATE for invalid months/days)"""
+    month, day = observed_dates(hebYear, month, day)
+    valid = month > 0
+    jds = calendar_batch.hebrew_to_jd(np.full(month.shape, hebYear), np.where(valid, month, 7), np.where(valid, day, 1))
+    return np.where(valid, jds, NO_DATE)
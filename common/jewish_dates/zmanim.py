@@ -0,0 +1,221 @@
+#  zmanim.py: Annual zmanim tables for one location, cached in a memory-mapped binary file.
+#
+# A table holds, for every day of a Gregorian year, the times (in minutes from midnight, local time) of:
+#   sunrise, sunset, alot hashachar and tzeit hakochavim (the degree-based times, see DEGREES),
+# and the shaah zmanit in hundredths of a minute (as returned by sun.GetShaaZmanit).
+# Days with no sunrise/sunset hold NO_TIME.
+#
+# The file is a small header followed by a little-endian int16 array of shape (days, len(FIELDS)).
+# Readers map it with numpy.memmap, so a lookup is a single row read and all processes share the same pages.
+#
+# location is a locations.Location (or a sun.py location tuple). With an IANA timezone the times of each day
+# are in that day's UTC offset (DST included).
+#
+# precision selects the computation: PRECISION_LOW is sun.py's approximation (vectorized in sun_batch),
+# PRECISION_HIGH is astro.sunpos (see sun_precise), accurate enough for candle lighting but ~30 times slower
+# to build; once built, both tables cost the same to read.
+#
+import datetime
+import functools
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from common.jewish_dates import sun, sun_batch, sun_precise
+from common.jewish_dates.locations import get_utc_offsets, sun_location
+
+FIELDS = ('sunrise', 'sunset', 'shaa_zmanit', 'alot', 'tzeit')
+SUNRISE, SUNSET, SHAA_ZMANIT, ALOT, TZEIT = range(len(FIELDS))
+
+# Degrees below the horizon of the degree-based times
+DEGREES = {
+    ALOT: 16.1,         # Before sunrise
+    TZEIT: 8.5,         # After sunset
+}
+
+NO_TIME = -1
+
+PRECISION_LOW = 0
+PRECISION_HIGH = 1
+PRECISIONS = (PRECISION_LOW, PRECISION_HIGH)
+
+# The tables are kept in the project's zmanim directory (the ZMANIM_DIR environment variable overrides it). The files in it
+# are mapped and trusted once their header matches, so it is created private to the app's user and is never a shared one
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ZMANIM_DIR = os.environ.get('ZMANIM_DIR') or os.path.join(PROJECT_DIR, 'zmanim')
+ZMANIM_CACHE_SIZE = 16
+
+_MAGIC = b'ZMAN'
+_VERSION = 3
+# magic, version, year, latitude, longitude, elevation, days, fields, precision, timezone
+_HEADER = struct.Struct('<4sHhiiiHHB32s')
+
+
+def _minutes(time):
+    return NO_TIME if time is None else time[0] * 60 + time[1]
+
+
+def _time(minutes):
+    return None if minutes == NO_TIME else [minutes // 60, minutes % 60]
+
+
+def _year_days(year):
+    first = datetime.date(year, 1, 1)
+    return [first + datetime.timedelta(days) for days in range(datetime.date(year + 1, 1, 1).toordinal() - first.toordinal())]
+
+
+def compute_day(date, location):
+    """Returns the FIELDS of a day as a list of ints (see the module description), computed with the scalar sun module"""
+    row = [NO_TIME] * len(FIELDS)
+    location = sun_location(location, date)
+    sunrise = sun.GetSunrise(date.month, date.day, date.year, location)
+    sunset = sun.GetSunset(date.month, date.day, date.year, location)
+    if sunrise is None or sunset is None:
+        return row
+    row[SUNRISE] = _minutes(sunrise)
+    row[SUNSET] = _minutes(sunset)
+    row[SHAA_ZMANIT] = int(round(sun.GetShaaZmanit(sunrise, sunset) * 100))
+    row[ALOT] = _minutes(sun.GetSunriseDegreesBelowHorizon(date.month, date.day, date.year, DEGREES[ALOT], location))
+    row[TZEIT] = _minutes(sun.GetSunsetDegreesBelowHorizon(date.month, date.day, date.year, DEGREES[TZEIT], location))
+    return row
+
+
+def compute_day_precise(date, location):
+    """Returns the FIELDS of a day as a list of ints, computed with astro.sunpos (see sun_precise)"""
+    row = [NO_TIME] * len(FIELDS)
+    location = sun_location(location, date)
+    sunrise, sunset = sun_precise.sunrise_sunset(date, location)
+    if sunrise == NO_TIME or sunset == NO_TIME:
+        return row
+    row[SUNRISE] = sunrise
+    row[SUNSET] = sunset
+    row[SHAA_ZMANIT] = int(round((sunset - sunrise) / 0.12))           # As sun.GetShaaZmanit * 100
+    row[ALOT] = sun_precise.sunrise_degrees_below_horizon(date, DEGREES[ALOT], location)
+    row[TZEIT] = sun_precise.sunset_degrees_below_horizon(date, DEGREES[TZEIT], location)
+    return row
+
+
+def compute_year(year, location, precision=PRECISION_LOW):
+    """Returns the table of a year as an int16 array of shape (days, len(FIELDS))"""
+    days = _year_days(year)
+    if precision == PRECISION_HIGH:
+        return np.array([compute_day_precise(date, location) for date in days], dtype='<i2').reshape(-1, len(FIELDS))
+
+    years = np.full(len(days), year)
+    months = np.array([date.month for date in days])
+    mdays = np.array([date.day for date in days])
+    latitude, longitude, timezone, elevation = location
+    if isinstance(timezone, str):
+        location = (latitude, longitude, get_utc_offsets(timezone, year), elevation)
+
+    table = np.full((len(days), len(FIELDS)), NO_TIME, dtype='<i2')
+    sunrise, sunset = sun_batch.sunrise_sunset(years, months, mdays, location)
+    valid = (sunrise != NO_TIME) & (sunset != NO_TIME)
+    table[:, SUNRISE] = np.where(valid, sunrise, NO_TIME)
+    table[:, SUNSET] = np.where(valid, sunset, NO_TIME)
+    table[:, SHAA_ZMANIT] = np.where(valid, np.round((sunset - sunrise) / 0.12), NO_TIME)      # As sun.GetShaaZmanit * 100
+    alot = sun_batch.sunrise_degrees_below_horizon(years, months, mdays, DEGREES[ALOT], location)
+    tzeit = sun_batch.sunset_degrees_below_horizon(years, months, mdays, DEGREES[TZEIT], location)
+    table[:, ALOT] = np.where(valid, alot, NO_TIME)
+    table[:, TZEIT] = np.where(valid, tzeit, NO_TIME)
+    return table
+
+
+def _header(year, location, days, precision):
+    latitude, longitude, timezone, elevation = location
+    return _HEADER.pack(_MAGIC, _VERSION, year, latitude, longitude, elevation, days, len(FIELDS), precision, str(timezone).encode())
+
+
+def table_path(year, location, precision=PRECISION_LOW, directory=None):
+    latitude, longitude, timezone, elevation = location
+    timezone = str(timezone).replace('/', '_')
+    return os.path.join(directory or ZMANIM_DIR, 'zmanim-%s-%s-%s-%s-%s-%s.bin' % (year, latitude, longitude, timezone, elevation, precision))
+
+
+def write_table(path, year, location, precision=PRECISION_LOW, table=None):
+    """Computes (unless given) and writes the table of a year. The file is replaced atomically, so readers never see it half-written"""
+    if table is None:
+        table = compute_year(year, location, precision)
+    os.makedirs(os.path.dirname(path) or '.', mode=0o700, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_header(year, location, table.shape[0], precision))
+            f.write(np.ascontiguousarray(table, dtype='<i2').tobytes())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return path
+
+
+class ZmanimTable(object):
+    """
+    The zmanim of a year for one location, read from a memory-mapped table file.
+    Times are returned as [hour, minute] (like the sun module), or None.
+    """
+    def __init__(self, path, year, location, precision=PRECISION_LOW):
+        self.path = path
+        self.year = year
+        self.location = location
+        self.precision = precision
+        self._first = datetime.date(year, 1, 1).toordinal()
+        self.table = np.memmap(path, dtype='<i2', mode='r', offset=_HEADER.size).reshape(-1, len(FIELDS))
+
+    @classmethod
+    def open(cls, year, location, precision=PRECISION_LOW, directory=None):
+        """Opens the table of a year, building its file first if it is missing or was written for other parameters"""
+        path = table_path(year, location, precision, directory)
+        days = len(_year_days(year))
+        try:
+            with open(path, 'rb') as f:
+                valid = (f.read(_HEADER.size) == _header(year, location, days, precision) and
+                         os.fstat(f.fileno()).st_size == _HEADER.size + days * len(FIELDS) * 2)
+        except FileNotFoundError:
+            valid = False
+        if not valid:
+            write_table(path, year, location, precision)
+        return cls(path, year, location, precision)
+
+    def row(self, date):
+        return self.table[date.toordinal() - self._first]
+
+    def sunrise(self, date):
+        return _time(int(self.row(date)[SUNRISE]))
+
+    def sunset(self, date):
+        return _time(int(self.row(date)[SUNSET]))
+
+    def day_times(self, date):
+        """Returns (sunrise, sunset, shaa_zmanit) of a date, as returned by the sun module"""
+        row = self.row(date)
+        shaa = None if row[SHAA_ZMANIT] == NO_TIME else int(row[SHAA_ZMANIT]) / 100
+        return _time(int(row[SUNRISE])), _time(int(row[SUNSET])), shaa
+
+    def zman(self, date, field):
+        return _time(int(self.row(date)[field]))
+
+
+@functools.lru_cache(maxsize=ZMANIM_CACHE_SIZE)
+def get_zmanim_table(year, location, precision=PRECISION_LOW):
+    """Returns the (per-process cached) ZmanimTable of a year for a Location"""
+    return ZmanimTable.open(year, location, precision)
+
+
+def benchmark(location, years=(2018,), precisions=PRECISIONS):
+    """
+    Returns {precision: seconds} to compute one year-table in each mode (averaged over years).
+    The high-precision per-day terms are cleared first, so the first year pays for filling the cache.
+    """
+    sun_precise.day_terms.cache_clear()
+    results = {}
+    for precision in precisions:
+        start = time.perf_counter()
+        for year in years:
+            compute_year(year, location, precision)
+        results[precision] = (time.perf_counter() - start) / len(years)
+    return results
@@ -0,0 +1,244 @@
+import datetime
+import os
+import tempfile
+import numpy as np
+import pytz
+from django.test import SimpleTestCase
+from common.date_utils import calendar_batch, calendar_util
+from common.jewish_dates import dates, holidays, locations, parasha, sun, sun_batch, sun_precise, zmanim
+from common.jewish_dates.hebrew_year import YEAR_TYPES, HebrewYear, weekday
+from common.utils.cache import ExpiringCache
+
+
+def hebrew_year_jds(first_year, last_year):
+    """Returns the julian dates of every day from Rosh Hashana of first_year to the end of last_year"""
+    start = calendar_util.hebrew_to_jd(first_year, 7, 1)
+    return [start + i for i in range(int(calendar_util.hebrew_to_jd(last_year + 1, 7, 1) - start))]
+
+
+class HebrewTableTestCase(SimpleTestCase):
+    def assertMatchesReference(self, jds):
+        for jd in jds:
+            self.assertEqual(calendar_util.jd_to_hebrew(jd), calendar_util.jd_to_hebrew_reference(jd), jd)
+
+    def test_table_edges(self):
+        first, last = calendar_util.HEBREW_TABLE_FIRST_YEAR, calendar_util.HEBREW_TABLE_LAST_YEAR
+        self.assertMatchesReference(hebrew_year_jds(first - 1, first + 1))          # Before and at the start of the table
+        self.assertMatchesReference(hebrew_year_jds(last - 1, last + 1))            # At the end of the table and after it
+
+    def test_leap_years(self):
+        self.assertTrue(calendar_util.hebrew_leap(5784))
+        self.assertFalse(calendar_util.hebrew_leap(5785))
+        self.assertMatchesReference(hebrew_year_jds(5782, 5787))                   # Leap, common, common, leap, common, common
+        self.assertEqual(calendar_util.jd_to_hebrew(calendar_util.gregorian_to_jd(2024, 3, 23)), (5784, 13, 13))     # 13 Adar II
+        self.assertEqual(calendar_util.jd_to_hebrew(calendar_util.gregorian_to_jd(2025, 3, 13)), (5785, 12, 13))     # 13 Adar
+
+    def test_set_range(self):
+        self.addCleanup(calendar_util.set_hebrew_table_range, calendar_util.HEBREW_TABLE_FIRST_YEAR, calendar_util.HEBREW_TABLE_LAST_YEAR)
+        calendar_util.set_hebrew_table_range(5780, 5782)
+        self.assertMatchesReference(hebrew_year_jds(5779, 5783))
+        self.assertMatchesReference([calendar_util.gregorian_to_jd(1700, 1, 1) + 0.3, calendar_util.gregorian_to_jd(2400, 12, 31)])
+
+
+class CalendarBatchTestCase(SimpleTestCase):
+    def test_gregorian(self):
+        jds = np.arange(calendar_util.gregorian_to_jd(1899, 1, 1), calendar_util.gregorian_to_jd(1901, 12, 31) + 1)     # 1900 is not leap
+        jds = np.concatenate((jds, np.arange(calendar_util.gregorian_to_jd(1999, 1, 1), calendar_util.gregorian_to_jd(2001, 12, 31) + 1)))
+        years, months, days = calendar_batch.jd_to_gregorian(jds)
+        self.assertEqual(list(zip(years.tolist(), months.tolist(), days.tolist())), [calendar_util.jd_to_gregorian(jd) for jd in jds.tolist()])
+        self.assertEqual(calendar_batch.gregorian_to_jd(years, months, days).tolist(), jds.tolist())
+
+    def test_hebrew(self):
+        jds = np.array(hebrew_year_jds(5782, 5787) + hebrew_year_jds(5599, 5600))
+        years, months, days = calendar_batch.jd_to_hebrew(jds)
+        dates = list(zip(years.tolist(), months.tolist(), days.tolist()))
+        self.assertEqual(dates, [calendar_util.jd_to_hebrew_reference(jd) for jd in jds.tolist()])
+        self.assertEqual(calendar_batch.hebrew_to_jd(years, months, days).tolist(), [calendar_util.hebrew_to_jd(*date) for date in dates])
+        self.assertEqual(calendar_batch.jd_to_hebrew(jds[:100].reshape(10, 10))[0].shape, (10, 10))            # Keeps the shape
+
+    def test_datetime64(self):
+        dates = np.array(['1900-03-01', '2000-02-29', '2025-02-22'], dtype='datetime64[D]')
+        jds = calendar_batch.datetime64_to_jd(dates)
+        self.assertEqual(jds.tolist(), [calendar_util.gregorian_to_jd(*date) for date in ((1900, 3, 1), (2000, 2, 29), (2025, 2, 22))])
+        self.assertEqual(calendar_batch.jd_to_datetime64(jds).tolist(), [datetime.date(1900, 3, 1), datetime.date(2000, 2, 29), datetime.date(2025, 2, 22)])
+
+
+class HebrewYearTestCase(SimpleTestCase):
+    def test_interned(self):
+        self.assertIs(HebrewYear(5785), HebrewYear(5785))
+
+    def test_dates(self):
+        for jd in hebrew_year_jds(5782, 5787):
+            year, month, day = calendar_util.jd_to_hebrew_reference(jd)
+            self.assertEqual(HebrewYear(year).jd(month, day), calendar_util.hebrew_to_jd(year, month, day))
+            self.assertEqual(HebrewYear(year).weekday(month, day), weekday(jd))
+            self.assertEqual(HebrewYear(year).month_days(month), calendar_util.hebrew_month_days(year, month))
+
+    def test_year_facts(self):
+        for year in range(5600, 6101):
+            rosh_hashana = calendar_util.hebrew_to_jd(year, 7, 1)
+            length = int(calendar_util.hebrew_to_jd(year + 1, 7, 1) - rosh_hashana)
+            hebrew_year = HebrewYear(year)
+            self.assertEqual((hebrew_year.rosh_hashana, hebrew_year.length, hebrew_year.leap), (rosh_hashana, length, calendar_util.hebrew_leap(year)))
+            self.assertEqual(hebrew_year.year_type, YEAR_TYPES[(weekday(rosh_hashana), length, weekday(calendar_util.hebrew_to_jd(year, 1, 15)))])
+            self.assertEqual(weekday(hebrew_year.bereshith), 6)
+            self.assertTrue(rosh_hashana + 22 <= hebrew_year.bereshith <= rosh_hashana + 28)              # 23 to 29 Tishrei
+
+
+class CalendarIteratorTestCase(SimpleTestCase):
+    def expected(self, jds, diaspora):
+        # Probes every day: Shabbatot and yamim tovim, with the parasha of the reference per-date computation
+        days = []
+        for jd in jds:
+            shabbat = weekday(jd) == 6
+            if shabbat or any(holiday.kind == holidays.YOM_TOV for holiday in holidays.get_holidays_jd(jd, diaspora)):
+                year, month, day = calendar_util.jd_to_hebrew_reference(jd)
+                parasha_ids = parasha.getTorahSectionIdsReference(month, day, year, diaspora) if shabbat else ()
+                days.append(dates.CalendarDay(datetime.date(*calendar_util.jd_to_gregorian(jd)), (year, month, day), parasha_ids,
+                                              holidays.get_hag_jd(jd, shabbat, diaspora), diaspora))
+        return days
+
+    def test_hebrew_years(self):
+        for diaspora in (False, True):
+            self.assertEqual(list(dates.iter_hebrew_years(5783, 3, diaspora)), self.expected(hebrew_year_jds(5783, 5785), diaspora))
+
+    def test_ranges(self):
+        start, end = datetime.date(2024, 9, 20), datetime.date(2024, 10, 27)           # Across Rosh Hashana 5785
+        jds = range(int(calendar_util.gregorian_to_jd(2024, 9, 20)), int(calendar_util.gregorian_to_jd(2024, 10, 27)) + 1)
+        expected = self.expected([jd + 0.5 for jd in jds], False)
+        self.assertEqual(list(dates.iter_calendar(start, end)), expected)
+        self.assertEqual(list(dates.iter_hebrew_calendar(expected[0].hebrew_date, expected[-1].hebrew_date)), expected)
+
+
+class ZmanimTableTestCase(SimpleTestCase):
+    location = (3215, 3458, 2, 53)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_table(self):
+        table = zmanim.ZmanimTable.open(2020, self.location, directory=self.directory)
+        self.assertEqual(table.table.shape, (366, len(zmanim.FIELDS)))
+        for date in zmanim._year_days(2020):
+            self.assertEqual(table.row(date).tolist(), zmanim.compute_day(date, self.location), date)
+        date = datetime.date(2020, 6, 21)
+        row = zmanim.compute_day(date, self.location)
+        self.assertEqual(table.day_times(date), (zmanim._time(row[zmanim.SUNRISE]), zmanim._time(row[zmanim.SUNSET]), row[zmanim.SHAA_ZMANIT] / 100))
+        self.assertEqual(table.zman(date, zmanim.TZEIT), zmanim._time(row[zmanim.TZEIT]))
+
+    def test_rebuilt(self):
+        path = zmanim.table_path(2019, self.location, directory=self.directory)
+        with open(path, 'wb') as f:
+            f.write(b'ZMAN stale')
+        table = zmanim.ZmanimTable.open(2019, self.location, directory=self.directory)
+        self.assertEqual(table.table.shape, (365, len(zmanim.FIELDS)))
+        self.assertEqual(os.path.getsize(path), zmanim._HEADER.size + 365 * len(zmanim.FIELDS) * 2)
+        self.assertEqual(table.row(datetime.date(2019, 1, 1)).tolist(), zmanim.compute_day(datetime.date(2019, 1, 1), self.location))
+
+
+class SunBatchTestCase(SimpleTestCase):
+    locations = (
+        (3215, 3458, 2, 53),        # Azriel
+        (4043, -7400, -5, 10),      # New York
+        (-3352, 15112, 10, 0),      # Sydney
+        (6000, 2500, 2, 0),         # Helsinki (no alot at midsummer)
+    )
+
+    def scalar(self, function, *args):
+        # sun.py returns [hour, minute] or None, and raises when a degree time does not exist
+        try:
+            time = function(*args)
+        except TypeError:
+            return sun_batch.NO_TIME
+        return sun_batch.NO_TIME if time is None else time[0] * 60 + time[1]
+
+    def test_year(self):
+        days = zmanim._year_days(2024)
+        years, months, mdays = (np.array(column) for column in zip(*((date.year, date.month, date.day) for date in days)))
+        for location in self.locations:
+            sunrise, sunset = sun_batch.sunrise_sunset(years, months, mdays, location)
+            alot = sun_batch.sunrise_degrees_below_horizon(years, months, mdays, 16.1, location)
+            tzeit = sun_batch.sunset_degrees_below_horizon(years, months, mdays, 8.5, location)
+            for i, date in enumerate(days):
+                self.assertEqual(sunrise[i], self.scalar(sun.GetSunrise, date.month, date.day, date.year, location), (date, location))
+                self.assertEqual(sunset[i], self.scalar(sun.GetSunset, date.month, date.day, date.year, location), (date, location))
+                self.assertEqual(alot[i], self.scalar(sun.GetSunriseDegreesBelowHorizon, date.month, date.day, date.year, 16.1, location), (date, location))
+                self.assertEqual(tzeit[i], self.scalar(sun.GetSunsetDegreesBelowHorizon, date.month, date.day, date.year, 8.5, location), (date, location))
+        self.assertIn(sun_batch.NO_TIME, alot.tolist())                             # Helsinki
+
+
+class LocationsTestCase(SimpleTestCase):
+    def test_utc_offsets(self):
+        for timezone in ('Asia/Jerusalem', 'America/New_York', 'Australia/Sydney', 'Europe/London', 'UTC'):
+            tz = pytz.timezone(timezone)
+            for year in (2018, 2024):
+                offsets = locations.get_utc_offsets(timezone, year)
+                self.assertFalse(offsets.flags.writeable)
+                for i, date in enumerate(zmanim._year_days(year)):
+                    noon = tz.localize(datetime.datetime.combine(date, datetime.time(12)), is_dst=False)
+                    self.assertEqual(offsets[i], noon.utcoffset().total_seconds() / 3600, (timezone, date))
+        self.assertEqual(locations.get_utc_offset('Asia/Jerusalem', datetime.date(2024, 1, 1)), 2)
+        self.assertEqual(locations.get_utc_offset('Asia/Jerusalem', datetime.date(2024, 7, 1)), 3)
+
+    def test_registry(self):
+        azriel = locations.get_location()
+        self.assertEqual(azriel, locations.get_location('Azriel'))
+        self.assertEqual(locations.get_location((3146, 3514, 2, 754)), (3146, 3514, 2, 754))
+        self.assertEqual(locations.sun_location(azriel, datetime.date(2024, 7, 1)), (3215, 3458, 3, 53))
+        with self.assertRaises(pytz.UnknownTimeZoneError):
+            locations.register_location('Nowhere', 0, 0, 'Nowhere/Nowhere')
+
+
+class SunPreciseTestCase(SimpleTestCase):
+    location = (3215, 3458, 2, 53)
+
+    def test_agrees_with_sun(self):
+        # sun.py is an approximation, so the two agree within a few minutes
+        for date in zmanim._year_days(2024):
+            sunrise, sunset = sun_precise.sunrise_sunset(date, self.location)
+            self.assertAlmostEqual(sunrise, zmanim._minutes(sun.GetSunrise(date.month, date.day, date.year, self.location)), delta=3)
+            self.assertAlmostEqual(sunset, zmanim._minutes(sun.GetSunset(date.month, date.day, date.year, self.location)), delta=3)
+            self.assertAlmostEqual(sun_precise.sunrise_degrees_below_horizon(date, 16.1, self.location),
+                                   zmanim._minutes(sun.GetSunriseDegreesBelowHorizon(date.month, date.day, date.year, 16.1, self.location)), delta=3)
+            self.assertAlmostEqual(sun_precise.sunset_degrees_below_horizon(date, 8.5, self.location),
+                                   zmanim._minutes(sun.GetSunsetDegreesBelowHorizon(date.month, date.day, date.year, 8.5, self.location)), delta=3)
+
+    def test_no_time(self):
+        self.assertEqual(sun_precise.sunrise_degrees_below_horizon(datetime.date(2024, 6, 21), 16.1, (6000, 2500, 2, 0)), sun_precise.NO_TIME)
+
+    def test_table(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        table = zmanim.ZmanimTable.open(2024, self.location, zmanim.PRECISION_HIGH, directory.name)
+        for date in (datetime.date(2024, 1, 1), datetime.date(2024, 6, 21), datetime.date(2024, 12, 31)):
+            self.assertEqual(table.row(date).tolist(), zmanim.compute_day_precise(date, self.location))
+        self.assertNotEqual(table.path, zmanim.table_path(2024, self.location, zmanim.PRECISION_LOW, directory.name))
+
+
+class ParashaTableTestCase(SimpleTestCase):
+    def test_table(self):
+        for (yearType, diaspora), schedule in parasha.torahSchedules.items():
+            for week in range(len(schedule) // 3):
+                sections = tuple(idTorah for idTorah in schedule[week * 3:week * 3 + 3] if idTorah != parasha.ID_NULL)
+                self.assertEqual(parasha.torahSectionIds(yearType, week, diaspora), sections, (yearType, diaspora, week))
+
+    def test_sections(self):
+        for jd in hebrew_year_jds(5782, 5787):
+            if weekday(jd) == 6:
+                year, month, day = calendar_util.jd_to_hebrew_reference(jd)
+                for diaspora in (False, True):
+                    self.assertEqual(parasha.getTorahSectionIds(month, day, year, diaspora), parasha.getTorahSectionIdsReference(month, day, year, diaspora))
+
+
+class ExpiringCacheTestCase(SimpleTestCase):
+    def test_expiring_cache(self):
+        builds = []
+        cache = ExpiringCache(lambda: builds.append(len(builds)) or len(builds))
+        self.assertEqual((cache.get(), cache.get()), (1, 1))                       # Built once
+        cache.invalidate()
+        self.assertEqual(cache.get(), 2)
+
+        cache = ExpiringCache(lambda: builds.append(len(builds)) or len(builds), max_age=0)
+        self.assertLess(cache.get(), cache.get())                                   # Built again after max_age
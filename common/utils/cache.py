@@ -0,0 +1,30 @@
+import threading
+import time
+
+
+class ExpiringCache(object):
+    """
+    A value built by a function on first use and kept in this process, for the in-memory indexes read from the DB.
+    invalidate() drops it (the models' signals call it when this process changes the data), and it is built again after
+    max_age seconds so changes made by other processes (e.g. the other web workers) are picked up too.
+    Building is serialized by a lock, so threads that find the value missing build it once.
+    """
+    def __init__(self, build, max_age=300):
+        self.build = build
+        self.max_age = max_age
+        self._value = None
+        self._loaded = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._value = None
+
+    def get(self):
+        value = self._value
+        if value is None or time.time() - self._loaded > self.max_age:
+            with self._lock:
+                value = self._value
+                if value is None or time.time() - self._loaded > self.max_age:     # Not built by another thread while waiting
+                    value = self._value = self.build()
+                    self._loaded = time.time()
+        return value
@@ -0,0 +1,201 @@
+#  verification.py: Checks the fast calendar and zmanim paths against the reference scalar functions.
+#
+# Every check compares a fast implementation with its reference on all the days of a range of julian dates.
+# The range (Gregorian 1900-2300 by default) is split into chunks that run in parallel on a process pool,
+# and the first mismatches of each check are reported (in date order).
+#
+#   python -m common.verification [--start 1900] [--end 2300] [--only hebrew_table parasha ...]
+#                                 [--workers N] [--mismatches 10]
+#
+# The exit status is 1 if any check has a mismatch.
+#
+# Checks:
+#   gregorian       calendar_batch.gregorian_to_jd/jd_to_gregorian     vs calendar_util
+#   hebrew_batch    calendar_batch.jd_to_hebrew/hebrew_to_jd            vs calendar_util.jd_to_hebrew_reference/hebrew_to_jd
+#   hebrew_table    calendar_util.jd_to_hebrew (table of year starts)   vs calendar_util.jd_to_hebrew_reference
+#   hebrew_year     HebrewYear.jd/weekday (cached year facts)           vs calendar_util.hebrew_to_jd
+#   parasha         parasha.getTorahSectionIds (per-year tables)        vs parasha.getTorahSectionIdsReference
+#   sun_batch       sun_batch sunrise/sunset/degree times               vs sun (for every location in SUN_LOCATIONS)
+#
+import argparse
+import concurrent.futures
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from common.date_utils import calendar_batch, calendar_util
+from common.jewish_dates import parasha, sun, sun_batch
+from common.jewish_dates.hebrew_year import HebrewYear, weekday
+
+START_YEAR = 1900
+END_YEAR = 2300
+CHUNK_DAYS = 3653
+MISMATCHES = 10
+
+# sun.py location tuples (latitude, longitude, timezone, elevation)
+SUN_LOCATIONS = (
+    (3215, 3458, 2, 53),        # Azriel
+    (3146, 3514, 2, 754),       # Jerusalem
+    (4043, -7400, -5, 10),      # New York
+    (-3352, 15112, 10, 0),      # Sydney
+    (5130, -10, 0, 0),          # London
+    (6000, 2500, 2, 0),         # Helsinki (no tzeit at midsummer)
+)
+SUN_DEGREES = (16.1, 8.5)
+
+CHECKS = OrderedDict()
+
+
+def check(name):
+    """Registers a check, taking a numpy array of julian dates and returning (ops, [(jd, message), ...])"""
+    def register(function):
+        CHECKS[name] = function
+        return function
+    return register
+
+
+@check('gregorian')
+def _gregorian(jds):
+    mismatches = []
+    year, month, day = calendar_batch.jd_to_gregorian(jds)
+    back = calendar_batch.gregorian_to_jd(year, month, day)
+    for i, jd in enumerate(jds.tolist()):
+        expected = calendar_util.jd_to_gregorian(jd)
+        got = (int(year[i]), int(month[i]), int(day[i]))
+        if got != expected:
+            mismatches.append((jd, 'jd_to_gregorian: %s != %s' % (got, expected)))
+        elif back[i] != calendar_util.gregorian_to_jd(*expected):
+            mismatches.append((jd, 'gregorian_to_jd%s: %s != %s' % (expected, back[i], calendar_util.gregorian_to_jd(*expected))))
+    return len(jds), mismatches
+
+
+@check('hebrew_batch')
+def _hebrew_batch(jds):
+    mismatches = []
+    year, month, day = calendar_batch.jd_to_hebrew(jds)
+    back = calendar_batch.hebrew_to_jd(year, month, day)
+    for i, jd in enumerate(jds.tolist()):
+        expected = calendar_util.jd_to_hebrew_reference(jd)
+        got = (int(year[i]), int(month[i]), int(day[i]))
+        if got != expected:
+            mismatches.append((jd, 'jd_to_hebrew: %s != %s' % (got, expected)))
+        elif back[i] != calendar_util.hebrew_to_jd(*expected):
+            mismatches.append((jd, 'hebrew_to_jd%s: %s != %s' % (expected, back[i], calendar_util.hebrew_to_jd(*expected))))
+    return len(jds), mismatches
+
+
+@check('hebrew_table')
+def _hebrew_table(jds):
+    mismatches = []
+    for jd in jds.tolist():
+        got = calendar_util.jd_to_hebrew(jd)
+        expected = calendar_util.jd_to_hebrew_reference(jd)
+        if got != expected:
+            mismatches.append((jd, 'jd_to_hebrew: %s != %s' % (got, expected)))
+    return len(jds), mismatches
+
+
+@check('hebrew_year')
+def _hebrew_year(jds):
+    mismatches = []
+    for jd in jds.tolist():
+        year, month, day = calendar_util.jd_to_hebrew_reference(jd)
+        expected = calendar_util.hebrew_to_jd(year, month, day)
+        got = HebrewYear(year).jd(month, day)
+        if got != expected or HebrewYear(year).weekday(month, day) != weekday(expected):
+            mismatches.append((jd, 'HebrewYear(%s).jd(%s, %s): %s != %s' % (year, month, day, got, expected)))
+    return len(jds), mismatches
+
+
+@check('parasha')
+def _parasha(jds):
+    mismatches = []
+    for jd in jds.tolist():
+        year, month, day = calendar_util.jd_to_hebrew_reference(jd)
+        for diaspora in (False, True):
+            got = parasha.getTorahSectionIds(month, day, year, diaspora)
+            expected = parasha.getTorahSectionIdsReference(month, day, year, diaspora)
+            if got != expected:
+                mismatches.append((jd, 'getTorahSectionIds(%s, %s, %s, %s): %s != %s' % (month, day, year, diaspora, got, expected)))
+    return len(jds) * 2, mismatches
+
+
+def _scalar_minutes(function, *args):
+    # sun.py returns [hour, minute] or None, and raises when a degree time does not exist
+    try:
+        time = function(*args)
+    except TypeError:
+        return sun_batch.NO_TIME
+    return sun_batch.NO_TIME if time is None else time[0] * 60 + time[1]
+
+
+@check('sun_batch')
+def _sun_batch(jds):
+    mismatches = []
+    ops = 0
+    year, month, day = calendar_batch.jd_to_gregorian(jds)
+    dates = list(zip(year.tolist(), month.tolist(), day.tolist()))
+    for location in SUN_LOCATIONS:
+        batch = [('sunrise', sun.GetSunrise, ()), ('sunset', sun.GetSunset, ())]
+        computed = list(sun_batch.sunrise_sunset(year, month, day, location))
+        for degrees in SUN_DEGREES:
+            batch.append(('sunrise %s deg' % degrees, sun.GetSunriseDegreesBelowHorizon, (degrees,)))
+            batch.append(('sunset %s deg' % degrees, sun.GetSunsetDegreesBelowHorizon, (degrees,)))
+            computed.append(sun_batch.sunrise_degrees_below_horizon(year, month, day, degrees, location))
+            computed.append(sun_batch.sunset_degrees_below_horizon(year, month, day, degrees, location))
+        for (name, function, args), values in zip(batch, computed):
+            for i, (y, m, d) in enumerate(dates):
+                expected = _scalar_minutes(function, m, d, y, *(args + (location,)))
+                if values[i] != expected:
+                    mismatches.append((float(jds[i]), '%s %s at %s: %s != %s' % (name, (y, m, d), location, values[i], expected)))
+            ops += len(dates)
+    return ops, mismatches
+
+
+def _run_chunk(name, first_jd, last_jd, limit):
+    ops, mismatches = CHECKS[name](np.arange(first_jd, last_jd + 1))
+    return name, ops, sorted(mismatches)[:limit]
+
+
+def verify(start_year=START_YEAR, end_year=END_YEAR, names=None, workers=None, limit=MISMATCHES, out=None):
+    """
+    Runs the checks on every day from 1 Jan start_year to 31 Dec end_year on a process pool.
+    Returns {check name: (ops, [(jd, message), ...] first mismatches)}
+    """
+    first = calendar_util.gregorian_to_jd(start_year, 1, 1)
+    last = calendar_util.gregorian_to_jd(end_year, 12, 31)
+    names = list(names or CHECKS)
+    results = OrderedDict((name, [0, []]) for name in names)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_chunk, name, jd, min(jd + CHUNK_DAYS - 1, last), limit)
+                   for name in names for jd in np.arange(first, last + 1, CHUNK_DAYS).tolist()]
+        for future in concurrent.futures.as_completed(futures):
+            name, ops, mismatches = future.result()
+            results[name][0] += ops
+            results[name][1] = sorted(results[name][1] + mismatches)[:limit]
+
+    if out:
+        for name, (ops, mismatches) in results.items():
+            out.write('%-14s %10d checked  %s\n' % (name, ops, 'OK' if not mismatches else '%s+ MISMATCHES' % len(mismatches)))
+            for jd, message in mismatches:
+                out.write('    %s %s: %s\n' % (jd, calendar_util.jd_to_gregorian(jd), message))
+    return OrderedDict((name, (ops, mismatches)) for name, (ops, mismatches) in results.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verifies the fast calendar and zmanim paths against the reference functions')
+    parser.add_argument('--start', type=int, default=START_YEAR, help='First Gregorian year')
+    parser.add_argument('--end', type=int, default=END_YEAR, help='Last Gregorian year')
+    parser.add_argument('--only', nargs='+', choices=list(CHECKS), help='Checks to run (all by default)')
+    parser.add_argument('--workers', type=int, help='Number of processes (the number of CPUs by default)')
+    parser.add_argument('--mismatches', type=int, default=MISMATCHES, help='Number of mismatches reported per check')
+    args = parser.parse_args(argv)
+
+    results = verify(args.start, args.end, args.only, args.workers, args.mismatches, sys.stdout)
+    return 1 if any(mismatches for ops, mismatches in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -170,6 +170,9 @@ USE_I18N = True
 USE_L10N = True
 USE_TZ = True
 
+# Parasha and holiday schedule: Israel (False) or the diaspora (True)
+DIASPORA = False
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/1.11/howto/static-files/
 STATIC_URL = '/static/'
@@ -27,11 +27,11 @@ router = routers.DefaultRouter()
 router.register(r'profiles', ProfileViewSet)
 router.register(r'parashas', ParashaViewSet)
 router.register(r'duties', DutyViewSet)
-#router.register(r'shabbats', ShabbatViewSet)
-#router.register(r'roster', RosterViewSet)
+router.register(r'shabbats', ShabbatViewSet)
+router.register(r'roster', RosterViewSet)
 
-#roster_router = routers.NestedDefaultRouter(router, r'roster', lookup='roster')
-#roster_router.register(r'assignments', AssignmentViewSet, base_name='roster-assignment')
+roster_router = routers.NestedDefaultRouter(router, r'roster', lookup='roster')
+roster_router.register(r'assignments', AssignmentViewSet, base_name='roster-assignment')
 
 profiles_router = routers.NestedDefaultRouter(router, r'profiles', lookup='profile')
 #profiles_router.register(r'families', FamilyViewSet, base_name='profile-family')
@@ -49,7 +49,7 @@ urlpatterns = [
     #url(r'^$', get_swagger_view(title='Djabbai API')),
 
     url(r'^api/v1/', include(router.urls)),
-    #url(r'^api/v1/', include(roster_router.urls)),
+    url(r'^api/v1/', include(roster_router.urls)),
     url(r'^api/v1/', include(profiles_router.urls)),
     #url(r'^api/v1/', include(families_router.urls)),
     url(r'^api/v1/auth/users/create/', MyUserCreateView.as_view(), name='user-create'),    # Override djoser registration. Make sure it comes *before* djoser
@@ -1,10 +1,10 @@
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import BaseCommand
 
-from common.jewish_dates.parasha import getTorahSections
-#from ...models import Parasha, Segment
+from common.jewish_dates.dates import iter_hebrew_years
+from common.jewish_dates.parasha import getTorahSectionName
 
 class Command(BaseCommand):
-    help = 'Creates Parashot for the specified year'
+    help = 'Lists the Shabbatot and holidays (with their Parashot) of the specified year'
 
     def add_arguments(self, parser):
         parser.add_argument('hebrewYear', nargs=1, type=int)
@@ -19,18 +19,7 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        for month in range(1, 8):
-            for day in range(1, 30):
-                self.stdout.write('%s/%s (day/month): %s' % (day, month, getTorahSections(month, day, options['hebrewYear'][0], options['diaspora'])))
-
-        return
-        for poll_id in options['poll_id']:
-            try:
-                poll = Poll.objects.get(pk=poll_id)
-            except Poll.DoesNotExist:
-                raise CommandError('Poll "%s" does not exist' % poll_id)
-
-            poll.opened = False
-            poll.save()
-
-            self.stdout.write(self.style.SUCCESS('Successfully closed poll "%s"' % poll_id))
+        for day in iter_hebrew_years(options['hebrewYear'][0], 1, options['diaspora']):
+            hebYear, month, hebDay = day.hebrew_date
+            sections = ', '.join(name for name in map(getTorahSectionName, day.parasha_ids) if name)
+            self.stdout.write('%s %s/%s (day/month): %s' % (day.date, hebDay, month, ', '.join(filter(None, (sections, day.holiday)))))
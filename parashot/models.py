@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from parashot.managers import ParashaManager
 
 
@@ -17,6 +19,13 @@ class Parasha(models.Model):
         verbose_name_plural = 'Parashot'
 
 
+@receiver(post_save, sender=Parasha)
+@receiver(post_delete, sender=Parasha)
+def invalidate_parasha_resolver(sender, **kwargs):
+    from parashot.resolver import parasha_resolver
+    parasha_resolver.invalidate()
+
+
 class Segment(models.Model):
     """
     List of parasha segments (aliyot)
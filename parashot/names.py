@@ -0,0 +1,113 @@
+from common.jewish_dates import holidays, parasha
+
+# Parasha.name of the weekly sections, by parasha.ID_* (combined sections are joined with '-', e.g. 'ויקהל-פקודי')
+SECTION_NAMES = {
+    parasha.ID_BERESHITH: 'בראשית',
+    parasha.ID_NOAH: 'נח',
+    parasha.ID_LEHLEHA: 'לך לך',
+    parasha.ID_VAYERA: 'וירא',
+    parasha.ID_HAYESARAH: 'חיי שרה',
+    parasha.ID_TOLEDOTH: 'תולדות',
+    parasha.ID_VAYETSE: 'ויצא',
+    parasha.ID_VAYISHLAH: 'וישלח',
+    parasha.ID_VAYESHEB: 'וישב',
+    parasha.ID_MIKKETS: 'מקץ',
+    parasha.ID_VAYIGGASH: 'ויגש',
+    parasha.ID_VAYHEE: 'ויחי',
+    parasha.ID_SHEMOTH: 'שמות',
+    parasha.ID_VAERA: 'וארא',
+    parasha.ID_BO: 'בא',
+    parasha.ID_BESHALLAH: 'בשלח',
+    parasha.ID_YITHRO: 'יתרו',
+    parasha.ID_MISHPATIM: 'משפטים',
+    parasha.ID_TERUMAH: 'תרומה',
+    parasha.ID_TETSAVVEH: 'תצווה',
+    parasha.ID_KITISSA: 'כי תשא',
+    parasha.ID_VAYAKHEL: 'ויקהל',
+    parasha.ID_PEKUDE: 'פקודי',
+    parasha.ID_VAYIKRA: 'ויקרא',
+    parasha.ID_TSAV: 'צו',
+    parasha.ID_SHEMINI: 'שמיני',
+    parasha.ID_TAZRIANG: 'תזריע',
+    parasha.ID_METSORANG: 'מצורע',
+    parasha.ID_AHAREMOTH: 'אחרי מות',
+    parasha.ID_KEDOSHIM: 'קדושים',
+    parasha.ID_EMOR: 'אמור',
+    parasha.ID_BEHAR: 'בהר',
+    parasha.ID_BEHUKKOTHAI: 'בחוקותי',
+    parasha.ID_BEMIDBAR: 'במדבר',
+    parasha.ID_NASO: 'נשא',
+    parasha.ID_BEHAALOTEHA: 'בהעלותך',
+    parasha.ID_SHELAHLEHA: 'שלח',
+    parasha.ID_KORAH: 'קרח',
+    parasha.ID_HUKATH: 'חוקת',
+    parasha.ID_BALAK: 'בלק',
+    parasha.ID_PINHAS: 'פינחס',
+    parasha.ID_MATOTH: 'מטות',
+    parasha.ID_MASEH: 'מסעי',
+    parasha.ID_DEBARIM: 'דברים',
+    parasha.ID_VAETHANAN: 'ואתחנן',
+    parasha.ID_EKEB: 'עקב',
+    parasha.ID_REEH: 'ראה',
+    parasha.ID_SHOFETIM: 'שופטים',
+    parasha.ID_KITETSE: 'כי תצא',
+    parasha.ID_KITABO: 'כי תבוא',
+    parasha.ID_NITSABIM: 'ניצבים',
+    parasha.ID_VAYELEH: 'וילך',
+    parasha.ID_HAAZINU: 'האזינו',
+    parasha.ID_SIMHATHTORAH: 'וזאת הברכה',
+}
+
+# Parasha.name of a Shabbat on which a holiday reading replaces the weekly section
+HOLIDAY_NAMES = {
+    parasha.ID_ROSH_HASHANAH_I: 'ראש השנה',
+    parasha.ID_YOM_KIPPUR: 'יום כיפור',
+    parasha.ID_SUCCOTH_I: 'סוכות',
+    parasha.ID_HOL_HAMOED_SUCCOTH: 'שבת חול המועד סוכות',
+    parasha.ID_SHEMINI_AZERETH: 'שמיני עצרת',
+    parasha.ID_PESAH_I: 'פסח',
+    parasha.ID_HOL_HAMOED_PESAH: 'שבת חול המועד פסח',
+    parasha.ID_PESAH_VII: 'שביעי של פסח',
+    parasha.ID_PESAH_VIII: 'אחרון של פסח',
+    parasha.ID_SHAVUOTH_I: 'שבועות',
+    parasha.ID_SHAVUOTH_II: 'שבועות',
+    parasha.ID_ROSH_HASHANAH_II: 'ראש השנה',
+    parasha.ID_SUCCOTH_II: 'סוכות',
+    parasha.ID_PESAH_II: 'פסח',
+}
+
+# The holiday reading (parasha.ID_*) of a yom tov on a weekday, by (holidays.* name, Hebrew day of the month)
+# (on Shabbat the calendar gives the reading, see parasha.getTorahSectionIds)
+YOM_TOV_READINGS = {
+    (holidays.ROSH_HASHANA, 1): parasha.ID_ROSH_HASHANAH_I,
+    (holidays.ROSH_HASHANA, 2): parasha.ID_ROSH_HASHANAH_II,
+    (holidays.YOM_KIPPUR, 10): parasha.ID_YOM_KIPPUR,
+    (holidays.SUKKOT, 15): parasha.ID_SUCCOTH_I,
+    (holidays.SUKKOT, 16): parasha.ID_SUCCOTH_II,                   # Diaspora
+    (holidays.SHEMINI_ATZERET, 22): parasha.ID_SHEMINI_AZERETH,     # Diaspora
+    (holidays.SIMCHAT_TORAH, 22): parasha.ID_SIMHATHTORAH,
+    (holidays.SIMCHAT_TORAH, 23): parasha.ID_SIMHATHTORAH,          # Diaspora
+    (holidays.PESACH, 15): parasha.ID_PESAH_I,
+    (holidays.PESACH, 16): parasha.ID_PESAH_II,                     # Diaspora
+    (holidays.PESACH, 21): parasha.ID_PESAH_VII,
+    (holidays.PESACH, 22): parasha.ID_PESAH_VIII,                   # Diaspora
+    (holidays.SHAVUOT, 6): parasha.ID_SHAVUOTH_I,
+    (holidays.SHAVUOT, 7): parasha.ID_SHAVUOTH_II,                  # Diaspora
+}
+
+
+def get_parasha_name(parasha_ids):
+    """Returns the Parasha.name read on a Shabbat, given its parasha.ID_* sections (None if there is no reading)"""
+    sections = [SECTION_NAMES[i] for i in parasha_ids if i in SECTION_NAMES]
+    if sections:
+        return '-'.join(sections)
+    for i in parasha_ids:
+        if i in HOLIDAY_NAMES:
+            return HOLIDAY_NAMES[i]
+    return None
+
+
+def get_yom_tov_reading(holiday, hebrew_day):
+    """Returns the parasha.ID_* sections read on a weekday yom tov (holidays.* name), as a calendar Shabbat's parasha_ids (() if unknown)"""
+    reading = YOM_TOV_READINGS.get((holiday, hebrew_day))
+    return (reading, ) if reading else ()
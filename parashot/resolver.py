@@ -0,0 +1,41 @@
+from common.utils.cache import ExpiringCache
+from parashot.models import Parasha
+from parashot.names import get_parasha_name
+
+
+class ParashaResolver(object):
+    """
+    Maps calendar section IDs (parasha.ID_*, as returned by the calendar for a Shabbat) to Parasha rows.
+    All Parashot are loaded into memory with one query and cached (see ExpiringCache); the index is dropped when a Parasha
+    is saved or deleted (see the signals in parashot.models).
+    """
+    def __init__(self, max_age=300):
+        self._cache = ExpiringCache(lambda: dict((parasha.name, parasha) for parasha in Parasha.objects.all()), max_age)
+
+    def invalidate(self):
+        self._cache.invalidate()
+
+    def index(self):
+        """Returns {Parasha.name: Parasha}"""
+        return self._cache.get()
+
+    def get(self, parasha_ids):
+        """Returns the Parasha read on a Shabbat with these section IDs (None if it has no reading or no Parasha row)"""
+        return self.index().get(get_parasha_name(parasha_ids))
+
+    def get_many(self, parasha_ids_list, create=False):
+        """
+        Returns {parasha_ids: Parasha} for many tuples of section IDs at once.
+        With create, Parashot missing from the DB (e.g. holiday readings) are created with one bulk_create.
+        """
+        names = dict((parasha_ids, get_parasha_name(parasha_ids)) for parasha_ids in set(parasha_ids_list))
+        index = self.index()
+        missing = set(name for name in names.values() if name and name not in index)
+        if missing and create:
+            Parasha.objects.bulk_create(Parasha(name=name) for name in sorted(missing))
+            self.invalidate()
+            index = self.index()
+        return dict((parasha_ids, index[name]) for parasha_ids, name in names.items() if name in index)
+
+
+parasha_resolver = ParashaResolver()
@@ -1,7 +1,12 @@
-from django.test import TransactionTestCase
+from django.test import SimpleTestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
+import datetime
+from common.jewish_dates import holidays
+from common.jewish_dates.parasha import getTorahSections, getTorahYear, ID_SHUVA, ID_VAYAKHEL, ID_PEKUDE, ID_BERESHITH, ID_YOM_KIPPUR
+from .models import Parasha
+from .resolver import parasha_resolver
 from users.models import User
 
 
@@ -69,3 +74,49 @@ class AssignmentTestCase(TransactionTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         response = admin.post(reverse('segment-list'), {"parasha": 1, "segment_type": 8, "start_pos": "a", "end_pos": "b", "total_psukim": 1})
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class TorahSectionsTestCase(SimpleTestCase):
+    def test_torah_sections(self):
+        self.assertEqual(getTorahSections(7, 3, 5778, False), 'Haazinu, Shabbat Shuva')
+        self.assertEqual(getTorahSections(12, 23, 5778, False), 'Vayakhel, Pekude, Shabbat Parah')
+        self.assertEqual(getTorahSections(1, 22, 5778, False), 'Shemini')          # Israel is a week ahead after Pesach
+        self.assertEqual(getTorahSections(1, 22, 5778, True), '')                 # 8th day of Pesach in the diaspora
+        self.assertEqual(getTorahSections(7, 4, 5778, False), '')                 # Not a Shabbat
+
+    def test_torah_year(self):
+        torah_year = getTorahYear(5778, False)
+        self.assertEqual(len(torah_year.sections), len(torah_year.dates))
+        self.assertIn(ID_SHUVA, torah_year.sections[torah_year.dates[(7, 3)]])
+        self.assertIs(getTorahYear(5778, False), torah_year)                      # Cached
+
+
+class HolidaysTestCase(SimpleTestCase):
+    def test_holidays(self):
+        self.assertEqual(holidays.get_hag_and_shabbat(datetime.date(2018, 3, 31)), 'Pesach')
+        self.assertEqual(holidays.get_hag_and_shabbat(datetime.date(2018, 4, 1)), '')
+        self.assertEqual(holidays.get_hag_and_shabbat(datetime.date(2018, 4, 1), diaspora=True), 'Pesach')       # Second day
+        self.assertEqual(holidays.get_hag_and_shabbat(datetime.date(2017, 10, 7)), 'Sukkot')                     # Shabbat Chol HaMoed
+        self.assertEqual(holidays.get_hag_and_shabbat(datetime.date(2018, 4, 7)), 'Shabbat')
+        self.assertEqual(holidays.get_hag_and_shabbat(datetime.date(2018, 4, 7), diaspora=True), 'Pesach')
+        self.assertEqual([h.name for h in holidays.get_holidays(datetime.date(2017, 12, 18))], ['Chanukah', 'Rosh Chodesh'])
+        self.assertEqual(holidays.get_holidays(datetime.date(2017, 9, 24)), (holidays.Holiday('Tzom Gedaliah', holidays.FAST),))     # Postponed from Shabbat
+        self.assertEqual(holidays.get_holidays(datetime.date(2017, 9, 25)), ())
+
+
+class ParashaResolverTestCase(TransactionTestCase):
+    fixtures = ['torahParasha']
+
+    def test_resolver(self):
+        parasha_resolver.invalidate()
+        with self.assertNumQueries(1):
+            self.assertEqual(parasha_resolver.get((ID_BERESHITH,)).name, 'בראשית')
+            self.assertEqual(parasha_resolver.get((ID_VAYAKHEL, ID_PEKUDE, ID_SHUVA)).name, 'ויקהל-פקודי')
+            self.assertIsNone(parasha_resolver.get((ID_YOM_KIPPUR,)))          # No row yet
+            self.assertIsNone(parasha_resolver.get(()))
+
+        parashot = parasha_resolver.get_many([(ID_BERESHITH,), (ID_YOM_KIPPUR,)], create=True)
+        self.assertEqual(parashot[(ID_YOM_KIPPUR,)].name, 'יום כיפור')
+
+        Parasha.objects.filter(name='יום כיפור').get().delete()             # Signals refresh the index
+        self.assertIsNone(parasha_resolver.get((ID_YOM_KIPPUR,)))
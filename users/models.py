@@ -3,7 +3,7 @@ from itertools import chain
 from random import randint
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 from rest_framework.exceptions import ValidationError
@@ -564,3 +564,10 @@ class Profile(models.Model):
         if father_full_name:
             full_name = full_name + get_son_or_daughter_midfix(self) + father_full_name
         return postfix_user_type(full_name, title)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_yahrzeit_index(sender, **kwargs):
+    from users.yahrzeits import yahrzeit_index
+    yahrzeit_index.invalidate()
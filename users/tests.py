@@ -3,6 +3,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from .models import User, Profile, Family
+import datetime
 
 
 class UserTestCase(TransactionTestCase):
@@ -1873,3 +1874,29 @@ class UserTestCase(TransactionTestCase):
         self.assertEqual(response.data['full_name'], "פלוניא")
         self.assertEqual(response.data['full_aliya_name'], "פלוניא בן פלוניב")
         self.assertEqual(response.data['father']['full_name'], "פלוניב בן פלוניג")
+
+
+class YahrzeitTestCase(TransactionTestCase):
+    def test_yahrzeit_index(self):
+        from .yahrzeits import yahrzeit_index
+        adar1 = Profile.objects.create(full_name='adar1', dod_month=Profile.MONTH_ADAR1, dod_day=30)
+        adar2 = Profile.objects.create(full_name='adar2', dod_month=Profile.MONTH_ADAR2, dod_day=15)
+        cheshvan = Profile.objects.create(full_name='cheshvan', dod_month=Profile.MONTH_MARCHESHVAN, dod_day=30)
+        Profile.objects.create(full_name='no yahrzeit')
+
+        with self.assertNumQueries(1):
+            year = yahrzeit_index.year(5785)                                        # Common year, Cheshvan has 30 days
+            self.assertEqual(year[datetime.date(2025, 2, 28)], [adar1.pk])          # 30 Adar I -> 30 Shvat
+            self.assertEqual(year[datetime.date(2025, 3, 15)], [adar2.pk])          # Adar II -> Adar
+            self.assertEqual(year[datetime.date(2024, 12, 1)], [cheshvan.pk])
+            self.assertEqual(yahrzeit_index.on(datetime.date(2024, 3, 10)), [adar1.pk])         # Leap year
+            self.assertEqual(yahrzeit_index.on(datetime.date(2024, 3, 25)), [adar2.pk])
+            self.assertEqual(yahrzeit_index.on(datetime.date(2023, 11, 13)), [cheshvan.pk])     # 29 day Cheshvan
+            self.assertEqual(yahrzeit_index.for_shabbat(datetime.date(2025, 3, 15)), [adar2.pk])
+            self.assertEqual(yahrzeit_index.for_shabbat(datetime.date(2025, 2, 22)), [adar1.pk])
+            self.assertEqual(yahrzeit_index.for_shabbat(datetime.date(2025, 3, 1)), [])
+
+        adar2.dod_month = Profile.MONTH_NISAN                                       # Signals drop the index
+        adar2.save()
+        self.assertEqual(yahrzeit_index.on(datetime.date(2025, 3, 15)), [])
+        self.assertEqual(yahrzeit_index.on(datetime.date(2025, 4, 13)), [adar2.pk])
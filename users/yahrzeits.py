@@ -0,0 +1,78 @@
+import datetime
+import numpy as np
+from common.date_utils import calendar_batch, calendar_util
+from common.jewish_dates.yahrzeit import NO_DATE, yahrzeit_jds
+from common.utils.cache import ExpiringCache
+from users.models import Profile
+
+# Profile.MONTHS (from Tishrei) to calendar_util months (from Nisan); index 0 is unused
+CALENDAR_MONTHS = np.array([0, 7, 8, 9, 10, 11, 12, 13, 1, 2, 3, 4, 5, 6])
+
+
+class YahrzeitIndex(object):
+    """
+    Maps dates to the profiles whose yahrzeit (Profile.dod_month/dod_day) falls on them.
+    The yahrzeits of all the profiles are read with one query, and each Hebrew year is computed in one pass
+    (see common.jewish_dates.yahrzeit) the first time a date in it is looked up.
+    The yahrzeits and the years computed from them are cached together (see ExpiringCache), and dropped when a Profile is
+    saved or deleted (see the signals in users.models).
+    """
+    def __init__(self, max_age=300):
+        self._cache = ExpiringCache(self._read, max_age)
+
+    def invalidate(self):
+        self._cache.invalidate()
+
+    def _read(self):
+        # Returns the profiles' arrays and the {hebrew year: index} computed from them so far
+        rows = list(Profile.objects.filter(dod_month__isnull=False, dod_day__isnull=False).values_list('pk', 'dod_month', 'dod_day'))
+        pks, months, days = (np.array(column, dtype=np.int64) for column in zip(*rows)) if rows else (np.zeros(0, dtype=np.int64),) * 3
+        months = CALENDAR_MONTHS[np.where((months >= 1) & (months <= 13), months, 0)]
+        return (pks, months, days), {}
+
+    def profiles(self):
+        """Returns (pks, calendar_util months, days) arrays of the profiles with a yahrzeit"""
+        return self._cache.get()[0]
+
+    def year(self, hebrew_year):
+        """Returns {datetime.date: [profile pk, ...]} of the yahrzeits in a Hebrew year"""
+        profiles, years = self._cache.get()
+        index = years.get(hebrew_year)
+        if index is None:
+            pks, months, days = profiles
+            jds = yahrzeit_jds(hebrew_year, months, days)
+            valid = jds != NO_DATE
+            pks, jds = pks[valid], jds[valid]
+            order = np.argsort(jds, kind='mergesort')
+            years, gregorian_months, gregorian_days = calendar_batch.jd_to_gregorian(jds[order])
+            index = {}
+            for pk, date in zip(pks[order].tolist(), zip(years.tolist(), gregorian_months.tolist(), gregorian_days.tolist())):
+                index.setdefault(datetime.date(*date), []).append(pk)
+            years[hebrew_year] = index
+        return index
+
+    def on(self, date):
+        """Returns the pks of the profiles whose yahrzeit is on a datetime.date"""
+        hebrew_year = calendar_util.jd_to_hebrew(calendar_util.gregorian_to_jd(date.year, date.month, date.day))[0]
+        return self.year(hebrew_year).get(date, [])
+
+    def between(self, start, end):
+        """Returns {datetime.date: [profile pk, ...]} of the yahrzeits from start to end (inclusive)"""
+        found = {}
+        date = start
+        while date <= end:
+            pks = self.on(date)
+            if pks:
+                found[date] = pks
+            date += datetime.timedelta(1)
+        return found
+
+    def for_shabbat(self, shabbat):
+        """
+        Returns the pks of the profiles whose yahrzeit falls from a Shabbat to the following Friday
+        (the aliyah for a yahrzeit is given on the Shabbat before it), in date order
+        """
+        return [pk for date, pks in sorted(self.between(shabbat, shabbat + datetime.timedelta(6)).items()) for pk in pks]
+
+
+yahrzeit_index = YahrzeitIndex()